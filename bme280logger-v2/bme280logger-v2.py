@@ -127,6 +127,9 @@ error_log = None
 # Time-tracking dictionary
 time_dict = {"timestamp": 0, "time": 0, "N": 0}
 
+# perf_counter() of the last explicit stdout flush (screen output)
+last_flush = 0.0
+
 # Hard-coded sensor reboot logic
 trials = 3
 delay = 0.1
@@ -1000,6 +1003,8 @@ def print_data_line_to_screen(t, secs, count, sensor_values, cal_readings, senso
     For each sensor, always print three values: Temperature, Relative Humidity, and Pressure.
     If calibration exists for a type, use the calibrated value; otherwise, use the raw value.
     """
+    global last_flush
+
     out_vals = []
     sensors = len(sensor_values) // 3
     for sensor_index in range(sensors):
@@ -1033,7 +1038,13 @@ def print_data_line_to_screen(t, secs, count, sensor_values, cal_readings, senso
     line = format_data(time_dict, arr)
     # For screen brevity, replace the decimal portion of the second column:
     line_short = re.sub(r"\..*?,.*?,", ",", line, count=1)
-    print(line_short)
+    # One write per line; when stdout is block-buffered (redirected), flush
+    # about once a second so lines and messages never sit in the buffer long
+    sys.stdout.write(line_short + "\n")
+    now = perf_counter()
+    if now - last_flush >= 1.0:
+        sys.stdout.flush()
+        last_flush = now
 
 
 # ------------------------------
@@ -1216,79 +1227,85 @@ def main():
     tstart = datetime.now().timestamp()
 
     # create DataLog object
-    log = DataLog(tstart, base_dir, "thp", "csv", is_subdir, is_prefix)
-
-    # Print CSV header (with calibration columns if available)
-    print_screen_header(sensor_count, sensor_cal_types)
-    print_header_with_calibrations(sensor_count, sensor_cals, sensor_cal_types, log)
-    
-    # MAIN LOOP
-    while True:
-        disable_halt = True
-        tp_now = perf_counter()
-        t_now = datetime.now()
-        sensor_values = []   # Raw sensor values: for each sensor, [temp, hum, pres]
-        cal_readings = []    # For each sensor, a dict with calibrated values
-        sensor_ok = [False] * sensor_count
-        for s_idx, address in enumerate(sensors_list):
-            now_time = time.time()
-            if now_time < cooldown_until[s_idx]:
-                # skip reading => store NaNs
-                sensor_values.extend([np.nan, np.nan, np.nan])
-                cal_readings.append({})
-                continue
-            else:
-                # <--- WE JUST LEFT COOL-DOWN (if it was set before).
-                # If consecutive_failures[s_idx] was >=5, reset to 0 now.
-                if consecutive_failures[s_idx] >= 5:
+    with DataLog(tstart, base_dir, "thp", "csv", is_subdir, is_prefix) as log:
+
+        # Print CSV header (with calibration columns if available)
+        print_screen_header(sensor_count, sensor_cal_types)
+        print_header_with_calibrations(sensor_count, sensor_cals, sensor_cal_types, log)
+
+        # A console stays line-buffered; redirected output is block-buffered
+        # and flushed by print_data_line_to_screen about once a second
+        sys.stdout.flush()
+        if not sys.stdout.isatty() and hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(line_buffering=False, write_through=False)
+
+        # MAIN LOOP
+        while True:
+            disable_halt = True
+            tp_now = perf_counter()
+            t_now = datetime.now()
+            sensor_values = []   # Raw sensor values: for each sensor, [temp, hum, pres]
+            cal_readings = []    # For each sensor, a dict with calibrated values
+            sensor_ok = [False] * sensor_count
+            for s_idx, address in enumerate(sensors_list):
+                now_time = time.time()
+                if now_time < cooldown_until[s_idx]:
+                    # skip reading => store NaNs
+                    sensor_values.extend([np.nan, np.nan, np.nan])
+                    cal_readings.append({})
+                    continue
+                else:
+                    # <--- WE JUST LEFT COOL-DOWN (if it was set before).
+                    # If consecutive_failures[s_idx] was >=5, reset to 0 now.
+                    if consecutive_failures[s_idx] >= 5:
+                        consecutive_failures[s_idx] = 0
+                    # close (power on) this sensor
+                    r.ch_close(s_idx + 1)
+                # read sensor
+                success, t_, h_, p_, cal_dict, errors = read_and_calibrate_sensor_data(
+                    address=address,
+                    relay_obj=r,
+                    sensor_index=s_idx,
+                    sensor_cals=sensor_cals,
+                    trials=trials,
+                    delay=delay,
+                    is_relays=is_relays,
+                    is_simulation=is_simulation,
+                    errors=errors,
+                    count=count
+                )
+                sensor_values.extend([t_, h_, p_])
+                cal_readings.append(cal_dict)
+                if success:
+                    sensor_ok[s_idx] = True
                     consecutive_failures[s_idx] = 0
-                # close (power on) this sensor
-                r.ch_close(s_idx + 1)
-            # read sensor
-            success, t_, h_, p_, cal_dict, errors = read_and_calibrate_sensor_data(
-                address=address,
-                relay_obj=r,
-                sensor_index=s_idx,
-                sensor_cals=sensor_cals,
-                trials=trials,
-                delay=delay,
-                is_relays=is_relays,
-                is_simulation=is_simulation,
-                errors=errors,
-                count=count
-            )
-            sensor_values.extend([t_, h_, p_])
-            cal_readings.append(cal_dict)
-            if success:
-                sensor_ok[s_idx] = True
-                consecutive_failures[s_idx] = 0
-                cooldown_until[s_idx] = 0
-            else:
-                consecutive_failures[s_idx] += 1
-                if consecutive_failures[s_idx] >= 5:
-                    # 1 hour cooldown
-                    cooldown_until[s_idx] = now_time + COOLDOWN_DURATION
-                    # r.ch_open(s_idx + 1)
-                    print(f"Sensor {hex(address)} => 5 consecutive fails. Cooldown until {datetime.fromtimestamp(cooldown_until[s_idx])}.")
-        if all(sensor_ok):
-            for si in range(sensor_count):
-                consecutive_failures[si] = 0
-                cooldown_until[si] = 0
-        secs = tp_now - tp0
-        memdata = build_and_store_row(memdata, count, t_now, secs, sensor_values, cal_readings, sensor_cal_types, log, is_nan_logging, max_rows)
-
-        # Print to screen if we haven't suppressed
-        if not (np.isnan(sensor_values).all() and not is_nan_logging):
-            
-            print_data_line_to_screen(t_now, secs, count, sensor_values, cal_readings, sensor_cal_types)
-        disable_halt = False
-
-        # Wait for next interval
-        tp_end = perf_counter()
-        wait_time = count * interval - (tp_end - tp0)
-        if wait_time > 0:
-            sleep(wait_time)
-        count += 1
+                    cooldown_until[s_idx] = 0
+                else:
+                    consecutive_failures[s_idx] += 1
+                    if consecutive_failures[s_idx] >= 5:
+                        # 1 hour cooldown
+                        cooldown_until[s_idx] = now_time + COOLDOWN_DURATION
+                        # r.ch_open(s_idx + 1)
+                        print(f"Sensor {hex(address)} => 5 consecutive fails. Cooldown until {datetime.fromtimestamp(cooldown_until[s_idx])}.")
+            if all(sensor_ok):
+                for si in range(sensor_count):
+                    consecutive_failures[si] = 0
+                    cooldown_until[si] = 0
+            secs = tp_now - tp0
+            memdata = build_and_store_row(memdata, count, t_now, secs, sensor_values, cal_readings, sensor_cal_types, log, is_nan_logging, max_rows)
+
+            # Print to screen if we haven't suppressed
+            if not (np.isnan(sensor_values).all() and not is_nan_logging):
+
+                print_data_line_to_screen(t_now, secs, count, sensor_values, cal_readings, sensor_cal_types)
+            disable_halt = False
+
+            # Wait for next interval
+            tp_end = perf_counter()
+            wait_time = count * interval - (tp_end - tp0)
+            if wait_time > 0:
+                sleep(wait_time)
+            count += 1
 
 
 # ------------------------------
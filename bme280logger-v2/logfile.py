@@ -11,7 +11,7 @@ from datetime import datetime
 
 class DataLog:
     """Data log object class"""
-    _dt_list = []
+    _dt_set = set()
 
     
     # Constructor
@@ -27,9 +27,9 @@ class DataLog:
         # Generate logfile name
         self.dt = datetime.fromtimestamp(timestamp)
         self._dt_part = self.dt.strftime("%Y%m%d-%H%M%S")
-        if self._dt_part in DataLog._dt_list:
+        if self._dt_part in DataLog._dt_set:
             raise ValueError(f"The given datetime ({self.dt_part}) is already in use. Unable to create a new log object.")
-        DataLog._dt_list.append(self._dt_part)
+        DataLog._dt_set.add(self._dt_part)
         
         # Is the directory path valid
         if file_path != "":
@@ -90,15 +90,22 @@ class DataLog:
         return self._ts_prefix
 
 
-    # Destructor
-    def __del__(self):
-        if self._dt_part in DataLog._dt_list:
-            DataLog._dt_list.remove(self._dt_part)
+    def close(self):
+        """Release the datetime reserved by this log object."""
+        DataLog._dt_set.discard(self._dt_part)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
         
 class ErrorLog:
     """Error log object class"""
-    _log_list = []
+    _log_set = set()
     
     # Constructor
     def __init__(self, dir_path = "",
@@ -117,7 +124,7 @@ class ErrorLog:
         self._dir_path += name + "." + ext
         
         # Check if error log object already exists
-        if self._dir_path in ErrorLog._log_list:
+        if self._dir_path in ErrorLog._log_set:
             raise ValueError(f"The error log object ({self._dir_path}) already exists. Unable to create a new error log object.")
         
         # Create an error log file
@@ -126,7 +133,7 @@ class ErrorLog:
         except:
             print("Unable to create an error log")
             return
-        ErrorLog._log_list.append(self._dir_path)
+        ErrorLog._log_set.add(self._dir_path)
         self._is_header = False
 
     
@@ -144,10 +151,17 @@ class ErrorLog:
             f.write(out)
 
 
-    # Destructor
-    def __del__(self):
-        if self._dir_path in ErrorLog._log_list:
-            ErrorLog._log_list.remove(self._dir_path)
+    def close(self):
+        """Release the file path reserved by this error log object."""
+        ErrorLog._log_set.discard(self._dir_path)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 if __name__ == "__main__":
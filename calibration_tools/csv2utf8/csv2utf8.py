@@ -20,25 +20,49 @@ Author : Kim (modified by ChatGPT on Apr 19 2025)
 
 from __future__ import annotations
 
+import codecs
 import os
-import subprocess
 from pathlib import Path
 from typing import List
 
 
+# Number of leading bytes inspected when guessing the encoding of a file.
+_SNIFF_SIZE = 8192
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32le"),
+    (codecs.BOM_UTF32_BE, "utf-32be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16le"),
+    (codecs.BOM_UTF16_BE, "utf-16be"),
+)
+
+
 def get_file_encoding(file_path: str | os.PathLike) -> str | None:
-    """Return the charset reported by the *file* command (in lower‑case).
+    """Return a best guess of the charset of *file_path* (in lower‑case).
 
-    If no charset is reported, *None* is returned.
+    Only the first few kilobytes are inspected.  A byte‑order mark decides the
+    Unicode flavour; otherwise data that decodes as UTF‑8 is reported as
+    ``utf-8`` and anything else as ``iso-8859-1``.  Files containing NUL bytes
+    are reported as ``binary``.  For an empty file *None* is returned.
     """
-    result = subprocess.run(
-        ["file", "-bi", str(file_path)], capture_output=True, text=True, check=False
-    )
-    mime_type = result.stdout.strip()
-    charset_prefix = "charset="
-    if charset_prefix in mime_type:
-        return mime_type.split(charset_prefix)[-1].lower()
-    return None
+    with open(file_path, "rb") as file:
+        raw = file.read(_SNIFF_SIZE)
+
+    if not raw:
+        return None
+    for bom, name in _BOMS:
+        if raw.startswith(bom):
+            return name
+    if b"\x00" in raw:
+        return "binary"
+    # A multi-byte sequence may be cut at the end of the sample, so decode
+    # incrementally without flushing the final partial character.
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(raw, final=False)
+    except UnicodeDecodeError:
+        return "iso-8859-1"
+    return "utf-8"
 
 
 def _fix_pressure_header(line: str) -> str:
@@ -5,32 +5,171 @@ copy_pys2tools.py — Copy Python utilities (and any additional files explicitly
 listed under **[Include]** in *pysdeploy.lst*) into */opt/tools* (or a custom
 destination).  All ``*.py`` files are copied **unless** they or their parent
 directories are excluded in the **[Exclude]** section of *pysdeploy.lst*.
-Directories whose name ends with ``.old`` are always skipped.
+Directories whose name ends with ``.old`` and hidden directories (name starts
+with ``.``) are always skipped.
 """
 from __future__ import annotations
 
 import argparse
+import ctypes
+import errno
 import os
 import shutil
 import stat
+import sys
 from pathlib import Path
+from typing import Iterator
 
 
-def _add_ugo_rx(path: Path) -> None:
-    """Ensure *ugo+rx* on *path* without clobbering existing permissions."""
-    mode = os.stat(path).st_mode
-    mode |= (
-        stat.S_IRUSR | stat.S_IXUSR |
-        stat.S_IRGRP | stat.S_IXGRP |
-        stat.S_IROTH | stat.S_IXOTH
-    )
-    os.chmod(path, mode)
+# --------------------------------------------------------------------------- #
+# Cheap size/mtime lookup (Linux statx)
+# --------------------------------------------------------------------------- #
+_AT_FDCWD = -100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_MTIME = 0x40
+_STATX_SIZE = 0x200
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_int64),
+        ("tv_nsec", ctypes.c_uint32),
+        ("_reserved", ctypes.c_int32),
+    ]
+
+
+class _Statx(ctypes.Structure):
+    """``struct statx`` from <linux/stat.h> (256 bytes)."""
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("_spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64),
+        ("stx_size", ctypes.c_uint64),
+        ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", _StatxTimestamp),
+        ("stx_btime", _StatxTimestamp),
+        ("stx_ctime", _StatxTimestamp),
+        ("stx_mtime", _StatxTimestamp),
+        ("_spare", ctypes.c_uint8 * 128),
+    ]
+
+
+def _load_statx():
+    """Return libc's *statx* function, or *None* when it is not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        func = ctypes.CDLL(None, use_errno=True).statx
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int,
+                     ctypes.c_uint, ctypes.POINTER(_Statx)]
+    func.restype = ctypes.c_int
+    return func
+
+
+# Probed once at import time
+_STATX = _load_statx()
+
+
+def _fast_size_mtime(path: str | os.PathLike,
+                     dir_fd: int | None = None) -> tuple[int, float] | None:
+    """Return ``(size, mtime)`` of *path*, or *None* if it does not exist.
+
+    On Linux only these two fields are requested from *statx* without forcing
+    a sync with the file server; elsewhere :func:`os.stat` is used.  With
+    *dir_fd*, *path* is looked up relative to that open directory.
+    """
+    if _STATX is not None:
+        want = _STATX_SIZE | _STATX_MTIME
+        buf = _Statx()
+        rc = _STATX(_AT_FDCWD if dir_fd is None else dir_fd, os.fsencode(path),
+                    _AT_STATX_DONT_SYNC, want, ctypes.byref(buf))
+        if rc == 0 and buf.stx_mask & want == want:
+            return buf.stx_size, buf.stx_mtime.tv_sec + buf.stx_mtime.tv_nsec * 1e-9
+        if rc != 0 and ctypes.get_errno() == errno.ENOENT:
+            return None
+    try:
+        st = os.stat(path, dir_fd=dir_fd)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime
+
+
+def _is_up_to_date(src_st: os.stat_result, dst_size: int, dst_mtime: float) -> bool:
+    """True if the target needs no copy: it is at least as new as the source,
+    or (as rsync's quick check) has the same size and whole-second mtime,
+    which covers targets on file systems with coarse timestamps."""
+    if dst_mtime >= src_st.st_mtime:
+        return True
+    return dst_size == src_st.st_size and int(dst_mtime) == int(src_st.st_mtime)
+
+
+def _open_dir(path: str) -> int | None:
+    """Return a read-only descriptor for directory *path*, or *None* if
+    descriptor-relative lookups are not supported on this platform."""
+    if os.stat not in os.supports_dir_fd:
+        return None
+    try:
+        return os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return None
+
+
+def _copy_file(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    """Copy *src* to *dst* with its metadata, like :func:`shutil.copy2`.
+
+    Where available (Linux) the data is moved inside the kernel with
+    ``copy_file_range``, which may also reflink or copy server-side.  If that
+    is unsupported for the two files or stops short, :func:`shutil.copy2` is
+    used instead.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+            # 0 before the expected size (source shrank, or a filesystem
+            # that stops early): never keep the partial file
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+_UGO_RX = (
+    stat.S_IRUSR | stat.S_IXUSR |
+    stat.S_IRGRP | stat.S_IXGRP |
+    stat.S_IROTH | stat.S_IXOTH
+)
+
+
+def _add_ugo_rx(path: str | os.PathLike, mode: int) -> None:
+    """Ensure *ugo+rx* on *path* without clobbering existing permissions.
+
+    *mode* is the mode *path* already has (the copied source's), so it is
+    not stat'ed again.
+    """
+    os.chmod(path, stat.S_IMODE(mode) | _UGO_RX)
 
 
 # --------------------------------------------------------------------------- #
 # Configuration-file parsing
 # --------------------------------------------------------------------------- #
-def _read_pysdeploy_list() -> tuple[set[str], set[str], set[str]]:
+def _read_pysdeploy_list() -> tuple[frozenset[str], frozenset[str], frozenset[str]]:
     """Return (include_files, exclude_dirs, exclude_files) parsed from
     *pysdeploy.lst*.  Lines outside [Include]/[Exclude] are ignored."""
     include_files, exclude_dirs, exclude_files = set(), set(), set()
@@ -43,7 +182,7 @@ def _read_pysdeploy_list() -> tuple[set[str], set[str], set[str]]:
         if lst.is_file():
             break
     if not lst.is_file():
-        return include_files, exclude_dirs, exclude_files
+        return frozenset(), frozenset(), frozenset()
     else:
         print(f'Using: {lst}')
 
@@ -67,7 +206,37 @@ def _read_pysdeploy_list() -> tuple[set[str], set[str], set[str]]:
         elif section == "include":
             include_files.add(line)
 
-    return include_files, exclude_dirs, exclude_files
+    return frozenset(include_files), frozenset(exclude_dirs), frozenset(exclude_files)
+
+
+def _walk_files(root: str, exclude_dirs: frozenset[str]) -> Iterator[tuple[str, os.DirEntry]]:
+    """Yield ``(rel_path, entry)`` for every file below *root*, where
+    *rel_path* is the file's ``/``-separated path relative to *root*.
+
+    The walk keeps ``(directory, relative prefix)`` pairs on an explicit stack
+    and decides file/directory from the scandir entry type, so no extra stat
+    calls are made.  Hidden directories (``.git``, ``.venv`` …), directories
+    ending with ``.old`` and those listed in *exclude_dirs* are pruned without
+    being entered.  Unreadable directories
+    are skipped silently, as :func:`os.walk` does.
+    """
+    stack = [(root, "")]
+    while stack:
+        path, rel_prefix = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # prune while scanning: hidden, *.old and excluded dirs
+                    if (name[0] != "." and not name.endswith(".old")
+                            and name not in exclude_dirs):
+                        stack.append((entry.path, rel_prefix + name + "/"))
+                elif entry.is_file():
+                    yield rel_prefix + name, entry
 
 
 def _copy_files(dest: Path, *, force: bool, quiet: bool) -> int:
@@ -79,45 +248,46 @@ def _copy_files(dest: Path, *, force: bool, quiet: bool) -> int:
         if not quiet:
             print(f"Created destination directory {dest}")
 
-    cwd, dest = Path.cwd().resolve(), Path(dest).resolve()
+    # Both roots are resolved once; per-file paths are plain strings
+    cwd_s, dest_s = str(Path.cwd().resolve()), str(Path(dest).resolve())
     copied = 0
 
-    for root, dirs, files in os.walk(cwd):
-        # prune unwanted dirs *in place* so os.walk never enters them
-        dirs[:] = [
-            d for d in dirs
-            if not d.endswith(".old") and d not in exclude_dirs
-        ]
-        root_path = Path(root)
-
-        for fname in files:
-            rel = Path(root_path, fname).relative_to(cwd)
+    # Targets are looked up relative to an open descriptor of the destination
+    # (as os.fwalk does), so its path is not resolved again for every file
+    dest_fd = None if force else _open_dir(dest_s)
+    try:
+        for rel_str, entry in _walk_files(cwd_s, exclude_dirs):
+            fname = entry.name
 
-            # skip explicitly excluded files
-            if fname in exclude_files or str(rel) in exclude_files:
+            # copy *.py by default plus [Include] files, minus [Exclude] files
+            if (fname in exclude_files or rel_str in exclude_files
+                    or not (fname.endswith(".py") or fname in include_files
+                            or rel_str in include_files)
+                    or os.path.dirname(entry.path) == dest_s):
                 continue
 
-            # decide whether to copy
-            if rel.suffix == ".py":
-                should_copy = True      # default for .py
+            src = entry.path
+            dst = os.path.join(dest_s, fname)
+            # DirEntry caches the source stat, so only the target costs a syscall
+            if force:
+                dst_info = None
+            elif dest_fd is None:
+                dst_info = _fast_size_mtime(dst)
             else:
-                should_copy = fname in include_files or str(rel) in include_files
-
-            if not should_copy or root_path == dest:
-                continue
-
-            src = root_path / fname
-            dst = dest / fname
-            if dst.exists() and not force and dst.stat().st_mtime >= src.stat().st_mtime:
+                dst_info = _fast_size_mtime(fname, dest_fd)
+            if dst_info is not None and _is_up_to_date(entry.stat(), *dst_info):
                 if not quiet:
                     print(f"⇢ Skipping {src} (up-to-date)")
                 continue
 
-            shutil.copy2(src, dst)
-            _add_ugo_rx(dst)
+            _copy_file(src, dst)
+            _add_ugo_rx(dst, entry.stat().st_mode)
             copied += 1
             if not quiet:
                 print(f"✓ Copied {src} → {dst}")
+    finally:
+        if dest_fd is not None:
+            os.close(dest_fd)
 
     return copied
 
@@ -8,14 +8,11 @@ Original author: Kim
 Modified for new graph requirements and auto x-axis.
 """
 
-import pandas as pd
+import numpy as np
 import argparse
-import matplotlib.pyplot as plt
 import os
 import sys
 from pathlib import Path
-import re
-import glob
 
 def get_input_file_path(base_dir, file):
     """
@@ -29,6 +26,8 @@ def get_input_file_path(base_dir, file):
             return os.path.abspath(target)
     return None
 
+_MERGED_NAME_LEN = len('merged-YYYYMMDD-hhmmss.csv')
+
 def find_latest_merged_csv():
     """
     Look for merged-YYYYMMDD-hhmmss.csv in cal/, cal/analysis/, then the parent directory.
@@ -43,27 +42,28 @@ def find_latest_merged_csv():
         parent_dir
     ]
 
-    pattern = re.compile(r'merged-(\d{8}-\d{6})\.csv$')
-    candidates = []
+    best_key, best_path = None, None
 
     for d in dirs_to_check:
         if not os.path.isdir(d):
             continue
-        files = glob.glob(os.path.join(d, 'merged-*.csv'))
-        for f in files:
-            fname = os.path.basename(f)
-            match = pattern.match(fname)
-            if match:
-                dt_str = match.group(1)  # e.g. 20250407-114016
-                # convert "YYYYMMDD-HHMMSS" -> integer "YYYYMMDDHHMMSS"
-                dt_int = int(dt_str.replace('-', ''))
-                candidates.append((dt_int, os.path.abspath(f)))
-    if not candidates:
-        return None
-
-    # sort descending by dt_int => pick the newest
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    return candidates[0][1]
+        # scandir yields the names directly; no glob/stat per entry.  The
+        # fixed-width name is checked by slicing instead of a regex.
+        with os.scandir(d) as it:
+            for entry in it:
+                name = entry.name
+                if not (len(name) == _MERGED_NAME_LEN
+                        and name.startswith('merged-') and name.endswith('.csv')
+                        and name[7:15].isdecimal() and name[15] == '-'
+                        and name[16:22].isdecimal()):
+                    continue
+                # "YYYYMMDD-hhmmss" compares chronologically as a string;
+                # keep the newest, on a tie the first directory in the list
+                key = name[7:22]
+                if best_key is None or key > best_key:
+                    best_key, best_path = key, os.path.abspath(entry.path)
+
+    return best_path
 
 def determine_target_directory(rh_path, merged_path):
     """
@@ -90,7 +90,13 @@ def read_and_filter_data(file_path, threshold):
     Read the CSV file into a DataFrame and filter out rows where
     'Sum of abs(slope)' exceeds threshold.
     """
-    df = pd.read_csv(file_path)
+    import pandas as pd
+
+    # Multi-threaded Arrow parser when pyarrow is installed
+    try:
+        df = pd.read_csv(file_path, engine='pyarrow', dtype_backend='pyarrow')
+    except ImportError:
+        df = pd.read_csv(file_path, engine='c')
     df_filtered = df[df['Sum of abs(slope)'] <= threshold]
     return df_filtered
 
@@ -99,34 +105,35 @@ def analyze_column(data, col_mean_rhref, col_mean, targets):
     For each target in 'targets', find the row whose col_mean is closest.
     Keep each rank only once. Return a list of (Rank, RHref, RHx).
     """
-    results = []
-    seen_ranks = []
-
-    for target in targets:
-        # find row with col_mean closest to target
-        print(target)
-        closest_row = data.iloc[(data[col_mean] - target).abs().argsort()[:1]].iloc[0]
-        value = closest_row[col_mean]
-        dist = abs(value - target)
-        # skip if too far from target
-        if target < 80 and dist > 5:
-            continue
-        elif dist > 2.5:
-            continue
-        if closest_row['Rank'] not in seen_ranks:
-            results.append((int(closest_row['Rank']),
-                            closest_row[col_mean_rhref],
-                            closest_row[col_mean]))
-            seen_ranks.append(closest_row['Rank'])
+    values = data[col_mean].to_numpy(np.float64)
+    refs = data[col_mean_rhref].to_numpy()
+    ranks = data['Rank'].to_numpy()
+    targets_arr = np.asarray(targets, np.float64)
+
+    # Distance of every row to every target; the closest row per target is
+    # found with one argmin over the rows
+    diff = np.abs(values[:, None] - targets_arr[None, :])
+    idx = diff.argmin(axis=0)
+    dists = diff[idx, np.arange(len(targets_arr))]
+
+    # skip targets whose closest row is too far away (the former
+    # "target < 80 and dist > 5" branch fell through to this same limit)
+    idx = idx[dists <= 2.5]
+
+    # keep each rank only once, at its first target
+    _, first = np.unique(ranks[idx], return_index=True)
+    idx = idx[np.sort(first)]
+    results = [(int(ranks[i]), refs[i], values[i]) for i in idx]
 
     # sort by sensor RH
-    results_sorted = sorted(results, key=lambda x: x[2])
-    return results_sorted
+    return sorted(results, key=lambda x: x[2])
 
 def save_results_to_csv(results, file_path, value_col):
     """
     Save (Rank, RHref%, value_col) to CSV and a corresponding .txt.
     """
+    import pandas as pd
+
     headers = ['Rank', 'RHref%', value_col]
     df = pd.DataFrame(results, columns=headers)
     df.to_csv(file_path, index=False)
@@ -139,14 +146,22 @@ def plot_results(data, results, interval_col_start, interval_col_end, y_col, fil
     """
     Original plot: horizontal lines (interval start->end) at sensor mean.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
     fig, ax = plt.subplots()
 
-    # Create the plot
-    for row in results:
-        rank, rhref, rh = row
-        interval_start = data[data['Rank'] == rank][interval_col_start].values[0]
-        interval_end   = data[data['Rank'] == rank][interval_col_end].values[0]
-        ax.hlines(y=rh, xmin=interval_start, xmax=interval_end, colors='r', linewidth=2)
+    # Rank -> (interval start, interval end), built once
+    intervals = dict(zip(data['Rank'].to_numpy(),
+                         zip(data[interval_col_start].to_numpy(),
+                             data[interval_col_end].to_numpy())))
+
+    # Create the plot: all levels drawn as one LineCollection
+    segments = [[(intervals[rank][0], rh), (intervals[rank][1], rh)]
+                for rank, _, rh in results]
+    if segments:
+        ax.add_collection(LineCollection(segments, colors='r', linewidths=2))
+        ax.autoscale_view()
 
     # Adding grid, labels, and title
     ax.grid(True, which='both', linestyle='--', linewidth=0.5)
@@ -191,6 +206,9 @@ def plot_calibration_plateaus(
     - Plot merged_df time vs reference and sensor.
     - Only the intervals in analysis_subset are drawn as plateau lines and vertical offsets.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
     if 'Time (s)' not in merged_df.columns or 'RHref (%RH)' not in merged_df.columns:
         print("Merged CSV missing required columns for the new plateau plot.")
         return
@@ -216,28 +234,27 @@ def plot_calibration_plateaus(
     # Plot sensor
     ax.plot(merged_x, merged_df[sensor_label], label=sensor_label, color='tab:blue')
 
-    # Overlay calibration intervals from analysis_subset, also scaled
-    for _, row in analysis_subset.iterrows():
-        start_s = row.get('Interval start (s)', None)
-        end_s   = row.get('Interval end (s)', None)
-        ref_val = row.get('Mean: RHref (%RH)', None)
-        sensor_val = row.get(sensor_mean_col, None)
-
-        if pd.isna(start_s) or pd.isna(end_s) or pd.isna(ref_val) or pd.isna(sensor_val):
-            continue
-
-        # Scale intervals
-        start_x = start_s * x_scale
-        end_x   = end_s * x_scale
-        mid_x   = 0.5*(start_x + end_x)
-
-        # Horizontal line at sensor mean
-        ax.hlines(y=sensor_val, xmin=start_x, xmax=end_x, linestyles='-', color='k')
-        # Also a horizontal line at ref mean (if desired)
-        ax.hlines(y=ref_val, xmin=start_x, xmax=end_x, linestyles='-', color='k')
-        # Vertical line
-        ymin, ymax = sorted([ref_val, sensor_val])
-        ax.vlines(x=mid_x, ymin=ymin, ymax=ymax, linestyles='-', color='k')
+    # Overlay calibration intervals from analysis_subset, also scaled.
+    # Rows with a missing value are skipped.
+    cols = ['Interval start (s)', 'Interval end (s)', 'Mean: RHref (%RH)', sensor_mean_col]
+    sub = analysis_subset.reindex(columns=cols).to_numpy(np.float64, na_value=np.nan)
+    sub = sub[~np.isnan(sub).any(axis=1)]
+    start_x = sub[:, 0] * x_scale
+    end_x   = sub[:, 1] * x_scale
+    mid_x   = 0.5*(start_x + end_x)
+    ref_val, sensor_val = sub[:, 2], sub[:, 3]
+
+    # Horizontal lines at sensor and ref means, vertical line between them,
+    # all drawn as one LineCollection
+    segments = np.concatenate([
+        np.stack([np.column_stack([start_x, sensor_val]),
+                  np.column_stack([end_x, sensor_val])], axis=1),
+        np.stack([np.column_stack([start_x, ref_val]),
+                  np.column_stack([end_x, ref_val])], axis=1),
+        np.stack([np.column_stack([mid_x, np.minimum(ref_val, sensor_val)]),
+                  np.column_stack([mid_x, np.maximum(ref_val, sensor_val)])], axis=1),
+    ])
+    ax.add_collection(LineCollection(segments, linestyles='-', colors='k'))
 
     ax.set_xlabel(x_label)  # auto-chosen or "Time (s)"
     ax.set_ylabel('%RH')
@@ -266,6 +283,10 @@ def main():
         print(f'File {file_name} not found.')
         sys.exit()
 
+    # pandas and matplotlib are imported where they are used, so the
+    # checks above fail fast
+    import pandas as pd
+
     # 2) Find the latest merged CSV (including parent directory)
     merged_csv_path = find_latest_merged_csv()
 
@@ -281,11 +302,8 @@ def main():
     analysis_dir.mkdir(parents=True, exist_ok=True)
 
     # 5) Original steps: analyze ranks
-    targets = list(range(0, 90, 10))
-    targets.append(85)
-    targets.append(90)
-    targets.append(95)
-    targets.append(100)
+    # ascending, so a rank shared by two targets is kept at the lower one
+    targets = sorted([*range(0, 90, 10), 85, 90, 95, 100])
 
     # We'll keep these for plateau plotting:
     best_rh1_ranks = []
@@ -315,7 +333,11 @@ def main():
 
     # 6) Generate the new calibration plateau graphs if we have a merged CSV
     if merged_csv_path is not None and os.path.isfile(merged_csv_path):
-        merged_df = pd.read_csv(merged_csv_path)
+        # Only time, reference and sensor columns are plotted
+        header = pd.read_csv(merged_csv_path, nrows=0).columns
+        cols = [c for c in ('Time (s)', 'RHref (%RH)', 'RH1% (%)', 'RH2% (%)') if c in header]
+        merged_df = pd.read_csv(merged_csv_path, usecols=cols,
+                                dtype={c: 'float32' for c in cols}, engine='c')
 
         # If sensor1 present -> rh1_cal_plateaus.png
         has_rh1 = ('RH1% (%)' in merged_df.columns) and ('Mean: RH1% (%)' in df.columns)
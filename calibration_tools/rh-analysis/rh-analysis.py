@@ -17,29 +17,83 @@ All other behaviour of the original **rh‑analysis.py** is unchanged.
 Author: Kim (orig.) – updated 2025‑05‑03
 """
 
+from __future__ import annotations
+
 import argparse
-import glob
 import os
-import re
 import sys
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import json
-from typing import Dict, Any, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Tuple
 from datetime import datetime           # NEW – for the log time‑stamp
-from scipy.stats import linregress
-from sklearn.linear_model import LinearRegression
+
+if TYPE_CHECKING:                       # annotation only
+    import pandas as pd
+
+# pandas, matplotlib and scipy are imported inside the functions that use
+# them, so argument errors and a missing merged CSV are reported without
+# paying for their start-up
+
+# Optional JIT for the sliding-window scan; without numba the NumPy
+# implementation in window_stats() is used
+try:
+    from numba import njit, prange
+except ImportError:
+    njit, prange = None, range
 
 # External helper – parses the “zone,num1[,num2]” string
 from thpcaldb import parse_zone_numbers
 
+def _pyplot():
+    """
+    Import pyplot on first use with the non-interactive Agg backend: the
+    plots only go to PNG files, so no display (Tk/Qt) is probed, also over
+    SSH or in batch runs.  Long sensor traces are simplified and drawn in
+    chunks.
+    """
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+        matplotlib.rcParams.update({
+            "path.simplify": True,
+            "agg.path.chunksize": 10000,
+        })
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# One figure is created per run and cleared between plots, rather than a
+# new figure (canvas, renderer, fonts) being set up for every PNG
+_FIG = None
+
+
+def _plot_axes(figsize=None):
+    """Return (fig, ax) of the shared figure, emptied and reset to *figsize*
+    (default: rcParams) and the default subplot margins."""
+    plt = _pyplot()
+
+    global _FIG
+    if _FIG is None:
+        _FIG = plt.figure()
+    rc = plt.rcParams
+    _FIG.clear()
+    _FIG.set_size_inches(figsize or rc["figure.figsize"])
+    _FIG.subplots_adjust(left=rc["figure.subplot.left"],
+                         right=rc["figure.subplot.right"],
+                         bottom=rc["figure.subplot.bottom"],
+                         top=rc["figure.subplot.top"])
+    return _FIG, _FIG.add_subplot()
+
+
 def _regression_plot(x, y, slope, intercept, png_path, sensor_label):
     """Create scatter + fitted‑line plot (300 dpi)."""
-    fig, ax = plt.subplots(figsize=(6, 6))
-    ax.scatter(x, y, s=40, alpha=0.75, label="data")
+    plt = _pyplot()
+
+    fig, ax = _plot_axes(figsize=(6, 6))
+    # points rasterized, so vector output (SVG/PDF) stays small
+    ax.scatter(x, y, s=40, alpha=0.75, label="data", rasterized=True)
 
     xr = np.array([x.min() - 1, x.max() + 1])
     ax.plot(xr, slope * xr + intercept, lw=2, label=f"y = {slope:.4f}x + {intercept:.4f}")
@@ -54,8 +108,7 @@ def _regression_plot(x, y, slope, intercept, png_path, sensor_label):
     ax.legend()
     ax.set_aspect("equal", adjustable="box")
     fig.tight_layout()
-    plt.savefig(png_path, dpi=300)
-    plt.close(fig)
+    fig.savefig(png_path, dpi=300)
 
 
 def _regression_summary(lr, n):
@@ -73,6 +126,9 @@ def _regression_summary(lr, n):
     )
 
 
+_MERGED_NAME_LEN = len('merged-YYYYMMDD-hhmmss.csv')
+
+
 def find_latest_merged_csv():
     """
     Look for merged-YYYYMMDD-hhmmss.csv in cal/, cal/analysis/, then the parent directory.
@@ -87,27 +143,28 @@ def find_latest_merged_csv():
         parent_dir
     ]
 
-    pattern = re.compile(r'merged-(\d{8}-\d{6})\.csv$')
-    candidates = []
+    best_key, best_path = None, None
 
     for d in dirs_to_check:
         if not os.path.isdir(d):
             continue
-        files = glob.glob(os.path.join(d, 'merged-*.csv'))
-        for f in files:
-            fname = os.path.basename(f)
-            match = pattern.match(fname)
-            if match:
-                dt_str = match.group(1)  # e.g. 20250407-114016
-                # convert "YYYYMMDD-HHMMSS" -> integer "YYYYMMDDHHMMSS"
-                dt_int = int(dt_str.replace('-', ''))
-                candidates.append((dt_int, os.path.abspath(f)))
-    if not candidates:
-        return None
-
-    # sort descending by dt_int => pick the newest
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    return candidates[0][1]
+        # scandir yields the names directly; no glob/stat per entry.  The
+        # fixed-width name is checked by slicing instead of a regex.
+        with os.scandir(d) as it:
+            for entry in it:
+                name = entry.name
+                if not (len(name) == _MERGED_NAME_LEN
+                        and name.startswith('merged-') and name.endswith('.csv')
+                        and name[7:15].isdecimal() and name[15] == '-'
+                        and name[16:22].isdecimal()):
+                    continue
+                # "YYYYMMDD-hhmmss" compares chronologically as a string;
+                # keep the newest, on a tie the first directory in the list
+                key = name[7:22]
+                if best_key is None or key > best_key:
+                    best_key, best_path = key, os.path.abspath(entry.path)
+
+    return best_path
 
 
 def determine_target_directory(rh_path, merged_path):
@@ -136,8 +193,27 @@ def read_and_filter_data(file_path):
     Read the CSV file into a DataFrame and filter out rows where
     'Sum of abs(slope)' exceeds threshold.
     """
-    df = pd.read_csv(file_path)
-    df_filtered = df[['Time (s)','Measurement', 'RH1% (%)', 'RH2% (%)', 'RHref (%RH)']]
+    import pandas as pd
+
+    # Only the columns used below are parsed.  RH values carry 0.01 %RH
+    # resolution, so float32 is ample and halves the bytes the window scan
+    # streams through; Datetime is kept as text.  Time (s) and the
+    # Measurement counter stay float64: elapsed seconds on long logs need
+    # the full mantissa, and a blank counter cell reads as NaN either way.
+    header = pd.read_csv(file_path, nrows=0).columns
+    cols = [c for c in ('Datetime', 'Time (s)', 'Measurement',
+                        'RH1% (%)', 'RH2% (%)', 'RHref (%RH)') if c in header]
+    dtypes = {c: {'Datetime': str, 'Time (s)': np.float64,
+               'Measurement': np.float64}.get(c, np.float32)
+              for c in cols}
+
+    # Multi-threaded Arrow parser when pyarrow is installed.  Columns stay
+    # NumPy-backed for the window scan.
+    try:
+        df = pd.read_csv(file_path, engine='pyarrow', usecols=cols, dtype=dtypes)
+    except ImportError:
+        df = pd.read_csv(file_path, engine='c', usecols=cols, dtype=dtypes)
+    df_filtered = df[[c for c in cols if c != 'Datetime']]
     
     # Caldict addition
     date_time = None
@@ -166,21 +242,22 @@ def analyze_column(data: pd.DataFrame, col_mean_rhref: str, col_mean: str, targe
     if data.empty:
         return []
 
-    results, seen_ranks = [], []
+    values = data[col_mean].to_numpy()
+    refs   = data[col_mean_rhref].to_numpy()
+    ranks  = data["Rank"].to_numpy()
+    bands  = np.asarray(targets, dtype=values.dtype)   # rows: low, target, high
 
-    for low, target, high in targets:
-        # locate the single closest row
-        closest = data.loc[(data[col_mean] - target).abs().idxmin()]
-        value   = closest[col_mean]
+    # closest row for every target in one broadcast (rows x targets) argmin
+    idx = np.abs(values[:, None] - bands[None, :, 1]).argmin(axis=0)
 
-        # skip if the closest point is outside the tolerance band
-        if not (low <= value <= high):
-            continue
+    # skip targets whose closest point is outside the tolerance band
+    hit = values[idx]
+    idx = idx[(bands[:, 0] <= hit) & (hit <= bands[:, 2])]
 
-        rank = int(closest["Rank"])
-        if rank not in seen_ranks:
-            results.append((rank, closest[col_mean_rhref], value))
-            seen_ranks.append(rank)
+    # keep each rank only once, at its first target
+    _, first = np.unique(ranks[idx], return_index=True)
+    idx = idx[np.sort(first)]
+    results = [(int(ranks[i]), refs[i], values[i]) for i in idx]
 
     # sort by sensor RH ascending
     return sorted(results, key=lambda x: x[2])
@@ -191,27 +268,38 @@ def save_results_to_csv(results, file_path, value_col):
     """
     Save (Rank, RHref%, value_col) to CSV and a corresponding .txt.
     """
+    import pandas as pd
+
     headers = ['Rank', 'RHref%', value_col]
     df = pd.DataFrame(results, columns=headers)
-    df.to_csv(file_path, index=False)
+    df.to_csv(file_path, index=False, lineterminator='\n')
 
+    # The .txt copy drops Rank; select it in to_csv instead of slicing df
     txt_file_path = file_path.replace('.csv', '.txt')
-    df_txt = df[['RHref%', value_col]]
-    df_txt.to_csv(txt_file_path, index=False, header=True)
+    df.to_csv(txt_file_path, index=False, columns=['RHref%', value_col],
+              lineterminator='\n')
 
 
 def plot_results(data, results, interval_col_start, interval_col_end, y_col, filename):
     """
     Original plot: horizontal lines (interval start->end) at sensor mean.
     """
-    fig, ax = plt.subplots()
+    plt = _pyplot()
+    from matplotlib.collections import LineCollection
+
+    fig, ax = _plot_axes()
 
-    # Create the plot
-    for row in results:
-        rank, rhref, rh = row
-        interval_start = data[data['Rank'] == rank][interval_col_start].values[0]
-        interval_end   = data[data['Rank'] == rank][interval_col_end].values[0]
-        ax.hlines(y=rh, xmin=interval_start, xmax=interval_end, colors='r', linewidth=2)
+    # Rank -> (interval start, interval end), built once
+    intervals = dict(zip(data['Rank'].to_numpy(),
+                         zip(data[interval_col_start].to_numpy(),
+                             data[interval_col_end].to_numpy())))
+
+    # Create the plot: all levels drawn as one LineCollection
+    segments = [[(intervals[rank][0], rh), (intervals[rank][1], rh)]
+                for rank, _, rh in results]
+    if segments:
+        ax.add_collection(LineCollection(segments, colors='r', linewidths=2))
+        ax.autoscale_view()
 
     # Adding grid, labels, and title
     ax.set_ylim(0, 100)
@@ -220,12 +308,11 @@ def plot_results(data, results, interval_col_start, interval_col_end, y_col, fil
     ax.set_xlabel('Measurement Number')
     ax.set_ylabel(f'{y_col}')
     ax.set_title('Calibration Levels')
-    plt.yticks([i for i in range(0, 101, 10)])
+    ax.set_yticks([i for i in range(0, 101, 10)])
     ax.set_ylim(0, 100)
 
     # Save the plot
-    plt.savefig(filename, dpi=300)
-    plt.close()
+    fig.savefig(filename, dpi=300)
 
 
 # ---------------------------------------------------------------
@@ -260,6 +347,9 @@ def plot_calibration_plateaus(
     - Plot merged_df time vs reference and sensor.
     - Only the intervals in analysis_subset are drawn as plateau lines and vertical offsets.
     """
+    plt = _pyplot()
+    from matplotlib.collections import LineCollection
+
     if 'Time (s)' not in merged_df.columns or 'RHref (%RH)' not in merged_df.columns:
         print("Merged CSV missing required columns for the new plateau plot.")
         return
@@ -278,35 +368,34 @@ def plot_calibration_plateaus(
     merged_x = merged_df['Time (s)'] * x_scale
 
     # Build the figure
-    fig, ax = plt.subplots()
+    fig, ax = _plot_axes()
 
     # Plot reference (scaled X)
     ax.plot(merged_x, merged_df['RHref (%RH)'], label='Ref RH', color='tab:red')
     # Plot sensor
     ax.plot(merged_x, merged_df[sensor_label], label=sensor_label, color='tab:blue')
 
-    # Overlay calibration intervals from analysis_subset, also scaled
-    for _, row in analysis_subset.iterrows():
-        start_s = row.get('Interval start (s)', None)
-        end_s   = row.get('Interval end (s)', None)
-        ref_val = row.get('Mean: RHref (%RH)', None)
-        sensor_val = row.get(sensor_mean_col, None)
-
-        if pd.isna(start_s) or pd.isna(end_s) or pd.isna(ref_val) or pd.isna(sensor_val):
-            continue
-
-        # Scale intervals
-        start_x = start_s * x_scale
-        end_x   = end_s * x_scale
-        mid_x   = 0.5*(start_x + end_x)
-
-        # Horizontal line at sensor mean
-        ax.hlines(y=sensor_val, xmin=start_x, xmax=end_x, linestyles='-', color='k')
-        # Also a horizontal line at ref mean (if desired)
-        ax.hlines(y=ref_val, xmin=start_x, xmax=end_x, linestyles='-', color='k')
-        # Vertical line
-        ymin, ymax = sorted([ref_val, sensor_val])
-        ax.vlines(x=mid_x, ymin=ymin, ymax=ymax, linestyles='-', color='k')
+    # Overlay calibration intervals from analysis_subset, also scaled.
+    # Rows with a missing value are skipped.
+    cols = ['Interval start (s)', 'Interval end (s)', 'Mean: RHref (%RH)', sensor_mean_col]
+    sub = analysis_subset.reindex(columns=cols).to_numpy(np.float64, na_value=np.nan)
+    sub = sub[~np.isnan(sub).any(axis=1)]
+    start_x = sub[:, 0] * x_scale
+    end_x   = sub[:, 1] * x_scale
+    mid_x   = 0.5*(start_x + end_x)
+    ref_val, sensor_val = sub[:, 2], sub[:, 3]
+
+    # Horizontal lines at sensor and ref means, vertical line between them,
+    # all drawn as one LineCollection
+    segments = np.concatenate([
+        np.stack([np.column_stack([start_x, sensor_val]),
+                  np.column_stack([end_x, sensor_val])], axis=1),
+        np.stack([np.column_stack([start_x, ref_val]),
+                  np.column_stack([end_x, ref_val])], axis=1),
+        np.stack([np.column_stack([mid_x, np.minimum(ref_val, sensor_val)]),
+                  np.column_stack([mid_x, np.maximum(ref_val, sensor_val)])], axis=1),
+    ])
+    ax.add_collection(LineCollection(segments, linestyles='-', colors='k'))
 
     ax.set_ylim(0, 100)
     ax.yaxis.set_major_locator(plt.MultipleLocator(10))
@@ -315,21 +404,117 @@ def plot_calibration_plateaus(
     ax.set_title('Calibration Levels')
     ax.grid(True, which='major')
     ax.legend(loc='upper left')
-    plt.savefig(out_png, dpi=300)
-    plt.close()
+    fig.savefig(out_png, dpi=300)
 
 
-def compute_slope(df, xcol, ycol):
+def _window_stats_loop(t, y, starts, window):
+    """
+    Per-window kernel of window_stats() for numba: one pass for sums, min
+    and max and one for the centred slope sums, each window independently
+    so the windows are spread over threads (prange).
     """
-    Compute linear regression slope (m) and intercept (c) for ycol vs xcol in df.
-    Returns: (slope, intercept).
+    n = len(y)
+    k = len(starts)
+    slope = np.empty(k)
+    mean  = np.empty(k)
+    lo    = np.empty(k, y.dtype)
+    hi    = np.empty(k, y.dtype)
+    for j in prange(k):
+        a = starts[j]
+        b = min(a + window, n)
+        st = 0.0
+        sy = 0.0
+        mn = y[a]
+        mx = y[a]
+        for i in range(a, b):
+            st += t[i]
+            sy += y[i]
+            mn = min(mn, y[i])
+            mx = max(mx, y[i])
+        tm = st / (b - a)
+        ym = sy / (b - a)
+        sxx = 0.0
+        sxy = 0.0
+        for i in range(a, b):
+            dx = t[i] - tm
+            sxx += dx * dx
+            sxy += dx * (y[i] - ym)
+        slope[j] = sxy / sxx if sxx != 0.0 else 0.0
+        mean[j] = ym
+        lo[j] = mn
+        hi[j] = mx
+    return slope, mean, lo, hi
+
+
+# Compiled on first use; cache=True keeps the machine code between runs
+_window_stats_jit = (njit(parallel=True, fastmath=True, cache=True)(_window_stats_loop)
+                     if njit is not None else None)
+
+
+def window_stats(t, y, starts, window):
     """
-    X = df.iloc[:, xcol].values.reshape(-1,1)
-    Y = df.iloc[:, ycol].values.reshape(-1,1)
-    reg = LinearRegression().fit(X, Y)
-    coef = reg.coef_[0][0]
-    i = reg.intercept_[0]
-    return float(coef), float(i)
+    Slope (vs t), mean, min and max of y over every window
+    y[p : p + window], p in *starts*.  Windows running past the end of the
+    data are shortened, as before.  Returns four arrays aligned with *starts*.
+
+    Each window is centred on its own means before the sums, as a
+    per-window fit would be, so flat or repeated plateaus keep exact ties
+    in 'Sum of abs(slope)' and the ranks stay stable.  Full windows are
+    processed as (windows, window) blocks of a sliding view; slopes and
+    means are accumulated in float64.
+    """
+    if _window_stats_jit is not None:
+        return _window_stats_jit(t, y, starts, window)
+
+    k = len(starts)
+    slope = np.empty(k)
+    mean  = np.empty(k)
+    lo    = np.empty(k, y.dtype)
+    hi    = np.empty(k, y.dtype)
+
+    def fit(tw, yw, rows):
+        tm = tw.mean(axis=-1, keepdims=True)
+        ym = yw.mean(axis=-1, dtype=np.float64, keepdims=True)
+        dx = tw - tm
+        sxx = (dx * dx).sum(axis=-1)
+        sxy = (dx * (yw - ym)).sum(axis=-1)
+        slope[rows] = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx != 0)
+        mean[rows] = ym[..., 0]
+        lo[rows] = yw.min(axis=-1)
+        hi[rows] = yw.max(axis=-1)
+
+    full = np.flatnonzero(starts + window <= len(y))
+    if len(full):
+        t_win = np.lib.stride_tricks.sliding_window_view(t, window)
+        y_win = np.lib.stride_tricks.sliding_window_view(y, window)
+        step = max(1, (1 << 20) // window)        # bounds the gathered block
+        for b in range(0, len(full), step):
+            rows = full[b:b + step]
+            fit(t_win[starts[rows]], y_win[starts[rows]], rows)
+    for j in np.flatnonzero(starts + window > len(y)):   # shortened tail
+        fit(t[starts[j]:], y[starts[j]:], j)
+    return slope, mean, lo, hi
+
+
+def window_stats_many(t, ys, starts, window):
+    """
+    window_stats() for several sensor series sharing *t* and *starts*.
+
+    Without the numba kernel the series run on joblib threads (the NumPy
+    reductions release the GIL, and threads share the arrays without
+    pickling).  The numba kernel is already parallel, so the
+    series are then scanned one after another, as without joblib.
+    """
+    def one(y):
+        return window_stats(t, y, starts, window)
+
+    if len(ys) < 2 or _window_stats_jit is not None:
+        return [one(y) for y in ys]
+    try:
+        from joblib import Parallel, delayed
+    except ImportError:
+        return [one(y) for y in ys]
+    return Parallel(n_jobs=len(ys), prefer="threads")(delayed(one)(y) for y in ys)
 
 
 def add_rank(df, by='Sum of abs(slope)', ascending=True):
@@ -342,37 +527,26 @@ def add_rank(df, by='Sum of abs(slope)', ascending=True):
     return ranked
 
 
+def rows_by_rank(df, ranks):
+    """
+    Rows of an add_rank() frame with the given Ranks, in Rank order.
+    Rank is 1..N in row order there, so this is positional indexing
+    instead of an isin() scan over the whole column.
+    """
+    return df.iloc[np.sort(np.asarray(ranks, dtype=np.intp)) - 1]
+
+
 def compute_targets(target_list):
-    result = []
-    levels = len(target_list)
-    index = 0
-    for level in target_list:
-        is_low = False
-        is_high = False
-        
-        # Get the target level:
-        target = level
-        
-        # Handle first and lowest value
-        if index == 0:
-            low = 0
-            is_low = True
-        
-        # Handle last and highest value
-        if index == levels - 1:
-            high = 100
-            is_high = True
-            
-        # Compute lower limit
-        if not is_low:
-            low = target - (target - target_list[index-1]) / 2
-        
-        # Compute lower limit
-        if not is_high:
-           high  = target + (target_list[index+1] - target) / 2
-        result.append([low, target, high])
-        index += 1
-    return result
+    """
+    Return a (levels, 3) array of [low, target, high] rows: each band runs
+    from the midpoint to the previous level up to the midpoint to the next
+    one, with 0 and 100 at the ends.
+    """
+    t = np.asarray(target_list, dtype=float)
+    mids = 0.5 * (t[:-1] + t[1:])
+    lows = np.concatenate(([0.0], mids))
+    highs = np.concatenate((mids, [100.0]))
+    return np.stack([lows, t, highs], axis=1)
 
 # ───────────────────────────────────────────────────────────────────────────────
 #  JSON‑based calibration‑file helpers (used if –cal is given)
@@ -521,7 +695,8 @@ def main():
                95,
                100]
     
-    targets = compute_targets(target_levels)
+    # limits are taken from the neighbouring levels, so sort them once here
+    targets = compute_targets(sorted(target_levels))
 
     # 1) Get current directory
     curdir = os.getcwd()
@@ -533,6 +708,9 @@ def main():
         print('Merge file not found.')
         sys.exit()
 
+    import pandas as pd
+    from scipy.stats import linregress
+
     # 3) Read/Filter rh_analysis.csv and build calibration timestamp
     cal_dt, df = read_and_filter_data(merged_csv_path)
     # Remove nan rows
@@ -541,18 +719,16 @@ def main():
     if args.z and cal_dt:
         cal_dt = cal_dt[:10] + " 00:00:00"
 
-    # 4) Determine sensor count
-    ref_col = ''
-    if 'RHref (%RH)' in df.columns:
-        ref_col = df.columns.get_loc('RHref (%RH)')
-    has_sensor1 = False
-    has_sensor2 = False
-    if 'RH1% (%)' in df.columns:
-        sensor_col1 = df.columns.get_loc('RH1% (%)')
-        has_sensor1 = True
-    if 'RH2% (%)' in df.columns:
-        sensor_col2 = df.columns.get_loc('RH2% (%)')
-        has_sensor2 = True
+    # 4) Determine sensor count.  The analysed columns are taken out of
+    #    the DataFrame once: time as float64, the RH columns as one
+    #    C-ordered float32 (column, sample) matrix whose rows are
+    #    contiguous per-column arrays for the scan.
+    cols = [c for c in ('RHref (%RH)', 'RH1% (%)', 'RH2% (%)')
+            if c in df.columns]
+    arr = {'Time (s)': df['Time (s)'].to_numpy(np.float64)}
+    arr.update(zip(cols, df[cols].to_numpy(np.float32).T.copy()))
+    has_sensor1 = 'RH1% (%)' in arr
+    has_sensor2 = 'RH2% (%)' in arr
 
     # 5) Create analysis directory
     print('1. Creating analysis directory and a log file.')
@@ -588,22 +764,22 @@ def main():
             "role":  "ref",                        # used for special tests
             "name":  "RHref%",                    # pretty‑print label
             "col":   "RHref (%RH)",               # column name in df
-            "slope": None,                        # slope cached per window
-            "col_idx": ref_col,                   # numeric column index
+            "slope": None,                        # slopes of all windows
+            "values": arr.get("RHref (%RH)"),     # column as ndarray
             "active": True                        # always present
         },
         {
             "role":  "measure",
             "name":  "RH1%",
             "col":   "RH1% (%)",
-            "col_idx": sensor_col1,
+            "values": arr.get("RH1% (%)"),
             "active": has_sensor1
         },
         {
             "role":  "measure",
             "name":  "RH2%",
             "col":   "RH2% (%)",
-            "col_idx": sensor_col2,
+            "values": arr.get("RH2% (%)"),
             "active": has_sensor2
         },
     ]
@@ -616,98 +792,83 @@ def main():
     sensor2    = 'RH2% (%)'
 
     # ------------------------------------------------------------------
-    # 1.  Container for result rows, keyed by sensor label
+    # 1.  Column layout of the result rows, keyed by sensor label
     # ------------------------------------------------------------------
     core_cols = [
         "Start index", "End index", "N",
         "Interval start (s)", "Interval end (s)",
         "Sum of abs(slope)"
     ]
-    result_frames = {
-        s["name"]: pd.DataFrame(columns=core_cols + [
+    result_cols = {
+        s["name"]: core_cols + [
             f"Slope: {ref_name}",   f"Slope: {s['col']}",
             f"Mean: {ref_name}",    f"Mean: {s['col']}",
             f"Min: {ref_name}",     f"Max: {ref_name}",
             f"Min: {s['col']}",     f"Max: {s['col']}"
-        ])
+        ]
         for s in sensors if s["role"] == "measure"
-    }    
-        
-    # Define loop variables
-    pos = start
-    time_col = 0
-    
+    }
+
     # Minium and maximum allowed sensor values
     min_val = 0.01
     max_val = 99.99
-    
-    
+
+
     # ------------------------------------------------------------------
-    # 2.  Sliding‑window loop
+    # 2.  Sliding‑window analysis, all windows at once
     # ------------------------------------------------------------------
     print("2. Performing linear regression analyses.")
-    pos = start
-    while pos < length - 1:             # need ≥ 2 data points
-        win = df.iloc[pos : pos + window]
-    
-        # --------------------------------------------------------------
-        # 2a. compute reference‑sensor stats once per window
-        # --------------------------------------------------------------
-        ref     = next(s for s in sensors if s["role"] == "ref")
-        ref_vec = win[ref["col"]].values
-    
-        # skip whole window if reference contains clamped values
-        if ref_vec.min() < min_val or ref_vec.min() > max_val:
-            pos += interval
-            continue
-    
-        pos_end         = pos + len(win) - 1
-        mean_ref        = ref_vec.mean()
-        ref["slope"], _ = compute_slope(win, time_col, ref["col_idx"])
-    
-        # --------------------------------------------------------------
-        # 2b. loop over each measurement sensor
-        # --------------------------------------------------------------
-        for s in sensors:
-            if s["role"] != "measure" or not s["active"]:
-                continue
-    
-            vec = win[s["col"]].values
-    
-            # --- validity checks --------------------------------------
-            proceed = (min_val <= vec.min() <= max_val)
-            if proceed and abs(vec.mean() - mean_ref) > max_rh_diff:
-                proceed = False
-            if not proceed:
-                continue
-    
-            # --- slope + combined slope threshold ---------------------
-            s["slope"], _   = compute_slope(win, time_col, s["col_idx"])
-            sum_abs_slopes  = abs(ref["slope"]) + abs(s["slope"])
-            if sum_abs_slopes > th:
-                continue     # skip storing this window
-    
-            # --- store summary row ------------------------------------
-            result_frames[s["name"]].loc[len(result_frames[s["name"]])] = {
-                "Start index":          pos,
-                "End index":            pos_end,
-                "N":                    len(win),
-                "Interval start (s)":   win["Time (s)"].iat[0],
-                "Interval end (s)":     win["Time (s)"].iat[-1],
-                "Sum of abs(slope)":    sum_abs_slopes,
-                
-                f"Slope: {ref_name}":      ref["slope"],
-                f"Slope: {s['col']}":      s["slope"],
-                f"Mean: {ref_name}":       mean_ref,
-                f"Mean: {s['col']}":       vec.mean(),
-                f"Min: {ref_name}":        ref_vec.min(),
-                f"Max: {ref_name}":        ref_vec.max(),
-                f"Min: {s['col']}":        vec.min(),
-                f"Max: {s['col']}":        vec.min(),
-            }
-    
-        # --------------------------------------------------------------
-        pos += interval
+    starts = np.arange(start, length - 1, interval)   # need ≥ 2 data points
+    ends   = np.minimum(starts + window, length) - 1   # last row of each window
+    t_all  = arr["Time (s)"]
+
+    # --------------------------------------------------------------
+    # 2a. reference‑sensor stats for every window
+    # --------------------------------------------------------------
+    ref = next(s for s in sensors if s["role"] == "ref")
+    ref["slope"], mean_ref, min_ref, max_ref = window_stats(
+        t_all, ref["values"], starts, window)
+
+    # skip windows whose reference contains clamped values
+    ref_ok = (min_ref >= min_val) & (min_ref <= max_val)
+
+    # --------------------------------------------------------------
+    # 2b. each measurement sensor: validity masks + one DataFrame
+    # --------------------------------------------------------------
+    active = [s for s in sensors if s["role"] == "measure" and s["active"]]
+    stats  = window_stats_many(t_all, [s["values"] for s in active],
+                               starts, window)
+
+    result_frames = {}
+    for s, (slope_s, mean_s, min_s, max_s) in zip(active, stats):
+        s["slope"] = slope_s
+        sum_abs_slopes = np.abs(ref["slope"]) + np.abs(s["slope"])
+
+        # --- validity checks + combined slope threshold ---------------
+        keep = (ref_ok
+                & (min_val <= min_s) & (min_s <= max_val)
+                & (np.abs(mean_s - mean_ref) <= max_rh_diff)
+                & (sum_abs_slopes <= th))
+
+        # --- summary rows of the accepted windows ---------------------
+        first, last = starts[keep], ends[keep]
+        result_frames[s["name"]] = pd.DataFrame({
+            "Start index":          first,
+            "End index":            last,
+            "N":                    last - first + 1,
+            "Interval start (s)":   t_all[first],
+            "Interval end (s)":     t_all[last],
+            "Sum of abs(slope)":    sum_abs_slopes[keep],
+
+            f"Slope: {ref_name}":      ref["slope"][keep],
+            f"Slope: {s['col']}":      s["slope"][keep],
+            f"Mean: {ref_name}":       mean_ref[keep],
+            f"Mean: {s['col']}":       mean_s[keep],
+            f"Min: {ref_name}":        min_ref[keep],
+            f"Max: {ref_name}":        max_ref[keep],
+            f"Min: {s['col']}":        min_s[keep],
+            f"Max: {s['col']}":        max_s[keep],
+        }, columns=result_cols[s["name"]])
     
     # ------------------------------------------------------------------
     # 3.  Tidy result DataFrames
@@ -789,12 +950,13 @@ def main():
             continue
 
         # Subset rows belonging to the chosen plateaus **inside the dedicated dataframe**
-        subset = res_df[res_df["Rank"].isin(ranks)]
+        subset = rows_by_rank(res_df, ranks)
         if subset.empty:
             continue
 
-        x = subset[f"Mean: {sensor_col}"].values
-        y = subset["Mean: RHref (%RH)"].values
+        # regression on the few plateau means is done in float64
+        x = subset[f"Mean: {sensor_col}"].to_numpy(np.float64)
+        y = subset["Mean: RHref (%RH)"].to_numpy(np.float64)
 
         lr = linregress(x, y)
         
@@ -839,7 +1001,7 @@ def main():
     if not merged_df.empty:
         # ── RH1 ───────────────────────────────────────────────
         if has_sensor1 and best_rh1_ranks:
-            rh1_subset = res1[res1["Rank"].isin(best_rh1_ranks)]
+            rh1_subset = rows_by_rank(res1, best_rh1_ranks)
             if not rh1_subset.empty:
                 out_png_1 = os.path.join(analysis_dir, "rh1_cal_plateaus.png")
                 plot_calibration_plateaus(
@@ -853,7 +1015,7 @@ def main():
 
         # ── RH2 ───────────────────────────────────────────────
         if has_sensor2 and best_rh2_ranks:
-            rh2_subset = res2[res2["Rank"].isin(best_rh2_ranks)]
+            rh2_subset = rows_by_rank(res2, best_rh2_ranks)
             if not rh2_subset.empty:
                 out_png_2 = os.path.join(analysis_dir, "rh2_cal_plateaus.png")
                 plot_calibration_plateaus(
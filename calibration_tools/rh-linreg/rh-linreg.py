@@ -12,7 +12,7 @@ import argparse                      # ADDED: command‑line argument parsing
 import csv
 import datetime
 import json
-import glob
+import math
 import os
 import re
 import sys
@@ -21,19 +21,24 @@ from pathlib import Path
 # ---------------------------------------------------------------------------
 # Third‑party imports
 # ---------------------------------------------------------------------------
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from typing import Dict, Any
 from typing import Tuple
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
+# Optional C serializer for thpcal.json; stdlib json is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
 # Caldict additions
 # Own library imports
 from thpcaldb import parse_zone_numbers
 
 
+_MERGED_NAME_LEN = len('merged-YYYYMMDD-hhmmss.csv')
+_SENSOR_NUM_RE = re.compile(r'\d+')         # "RH1%" -> "1"
+
+
 def find_latest_merged_csv():
     """
     Look for merged-YYYYMMDD-hhmmss.csv in cal/, cal/analysis/, then the parent directory.
@@ -48,27 +53,28 @@ def find_latest_merged_csv():
         parent_dir
     ]
 
-    pattern = re.compile(r'merged-(\d{8}-\d{6})\.csv$')
-    candidates = []
+    best_key, best_path = None, None
 
     for d in dirs_to_check:
         if not os.path.isdir(d):
             continue
-        files = glob.glob(os.path.join(d, 'merged-*.csv'))
-        for f in files:
-            fname = os.path.basename(f)
-            match = pattern.match(fname)
-            if match:
-                dt_str = match.group(1)  # e.g. 20250407-114016
-                # convert "YYYYMMDD-HHMMSS" -> integer "YYYYMMDDHHMMSS"
-                dt_int = int(dt_str.replace('-', ''))
-                candidates.append((dt_int, os.path.abspath(f)))
-    if not candidates:
-        return None
-
-    # sort descending by dt_int => pick the newest
-    candidates.sort(key=lambda x: x[0], reverse=True)
-    return candidates[0][1]
+        # scandir yields the names directly; no glob/stat per entry.  The
+        # fixed-width name is checked by slicing instead of a regex.
+        with os.scandir(d) as it:
+            for entry in it:
+                name = entry.name
+                if not (len(name) == _MERGED_NAME_LEN
+                        and name.startswith('merged-') and name.endswith('.csv')
+                        and name[7:15].isdecimal() and name[15] == '-'
+                        and name[16:22].isdecimal()):
+                    continue
+                # "YYYYMMDD-hhmmss" compares chronologically as a string;
+                # keep the newest, on a tie the first directory in the list
+                key = name[7:22]
+                if best_key is None or key > best_key:
+                    best_key, best_path = key, os.path.abspath(entry.path)
+
+    return best_path
 
 
 def read_and_filter_data(file_path):
@@ -76,13 +82,31 @@ def read_and_filter_data(file_path):
     Read the CSV file into a DataFrame and filter out rows where
     'Sum of abs(slope)' exceeds threshold.
     """
-    df = pd.read_csv(file_path)
-    df_filtered = df[['Time (s)','Measurement', 'RH1% (%)', 'RH2% (%)', 'RHref (%RH)']]
+    # Only the columns used below are parsed; the header is read first so
+    # a log without e.g. Datetime still loads.  RH values carry 0.01 %RH
+    # resolution, so float32 is ample; time stays float64 to keep
+    # sub-second steps on long logs, and Datetime is kept as text.  The
+    # Measurement counter is float64: exact, and a blank cell reads as NaN
+    # under either parser.
+    header = pd.read_csv(file_path, nrows=0).columns
+    cols = [c for c in ('Datetime', 'Time (s)', 'Measurement',
+                        'RH1% (%)', 'RH2% (%)', 'RHref (%RH)') if c in header]
+    dtypes = {c: {'Datetime': str, 'Time (s)': np.float64,
+                  'Measurement': np.float64}.get(c, np.float32)
+              for c in cols}
+
+    # Multi-threaded Arrow parser when pyarrow is installed.  Columns stay
+    # NumPy-backed so refs/sensor data remain zero-copy views.
+    try:
+        df = pd.read_csv(file_path, engine='pyarrow', usecols=cols, dtype=dtypes)
+    except ImportError:
+        df = pd.read_csv(file_path, engine='c', usecols=cols, dtype=dtypes)
+    df_filtered = df[[c for c in cols if c != 'Datetime']]
     
     # Caldict addition
     date_time = None
     try:
-        date_time = df['Datetime'][0]
+        date_time = df['Datetime'].iat[0]
     except:
         print('Invalid log format. Datetime value not found in the first data row.')
         
@@ -91,6 +115,20 @@ def read_and_filter_data(file_path):
     return date_time, df_filtered
 
 
+def valid_end(values, is_drying, min_val, max_val):
+    """
+    End of the usable span: one before the first reading below *min_val*
+    (drying) or above *max_val* (humidifying), else len(values).  For a
+    2-D array the ends of all columns come from one scan.
+
+    The ramps are noisy, not monotone, so this is a linear scan; argmax on
+    the boolean mask finds the first hit without building index arrays.
+    """
+    out = values < min_val if is_drying else values > max_val
+    first = out.argmax(axis=0)
+    return np.where(out.any(axis=0), first - 1, len(values))
+
+
 # ---------------------------------------------------------------------------
 # Helper: pretty print & optionally save regression results
 # ---------------------------------------------------------------------------
@@ -115,7 +153,7 @@ def report_regression(stats: dict,
     r2 = stats['r2']
     n_train = stats['n_train']
     n_test = stats['n_test']
-    number = re.findall('\d+', sensor_label)[0]
+    number = _SENSOR_NUM_RE.search(sensor_label).group()
 
     lines = [
         f"Analysis time : {ts}",
@@ -130,16 +168,15 @@ def report_regression(stats: dict,
         f"Test R²       : {r2:.4f}",
     ]
 
+    text = "\n".join(lines) + "\n"
+
     # --- console output ---------------------------------------------------
-    for ln in lines:
-        print(ln)
+    print(text, end='')
 
     # --- optional file output --------------------------------------------
     if save_to_file:
         out_name = sensor_label.lower().replace('%', '').replace(' ', '') + "_rhref_regression.txt"
-        with open(out_name, 'w', encoding='utf-8') as fh:
-            for ln in lines:
-                fh.write(ln + "\n")
+        Path(out_name).write_text(text, encoding='utf-8')
         print(f'→ saved stats to {out_name}')
 
 
@@ -147,29 +184,64 @@ def report_regression(stats: dict,
 # NEW: Regression engine
 # ---------------------------------------------------------------------------
 def run_regression(xs: np.ndarray, ys: np.ndarray):
-    X = xs.reshape(-1, 1)
-    y = ys
+    """Fit ys = slope * xs + intercept on a 70 % split, score on the rest.
 
-    Xtr, Xte, ytr, yte = train_test_split(
-        X, y, test_size=0.30, random_state=42, shuffle=True)
-
-    mdl = LinearRegression().fit(Xtr, ytr)
-    yhat = mdl.predict(Xte)
+    One regressor only, so the least-squares fit is the closed form on
+    centred sums; no model object is needed.
+    """
+    # Same shuffle as train_test_split(test_size=0.30, random_state=42):
+    # test rows are the first ceil(30 %) of a RandomState(42) permutation
+    idx = np.random.RandomState(42).permutation(len(xs))
+    n_test = int(np.ceil(0.30 * len(xs)))
+    te, tr = idx[:n_test], idx[n_test:]
+    Xtr, Xte, ytr, yte = xs[tr], xs[te], ys[tr], ys[te]
+
+    # float32 readings, float64 sums
+    Xtr, ytr = Xtr.astype(np.float64), ytr.astype(np.float64)
+
+    xbar, ybar = Xtr.mean(), ytr.mean()
+    dx, dy = Xtr - xbar, ytr - ybar
+    slope = (dx @ dy) / (dx @ dx)
+    intercept = ybar - slope * xbar
+    yhat = slope * Xte + intercept
+
+    resid = yte - yhat
+    ss_res = resid @ resid
+    ss_tot = ((yte - yte.mean()) ** 2).sum()
 
     stats = {
-        'intercept': mdl.intercept_,
-        'slope':     float(mdl.coef_[0]),
-        'mse':       mean_squared_error(yte, yhat),
-        'r2':        r2_score(yte, yhat),
+        'intercept': float(intercept),
+        'slope':     float(slope),
+        'mse':       float(ss_res / len(yte)),
+        'r2':        float(1.0 - ss_res / ss_tot),
         'n_train':   len(Xtr),
         'n_test':    len(Xte)
     }
-    return mdl, Xte, yte, yhat, stats
+    return Xte, yte, yhat, stats
 
 
 # ---------------------------------------------------------------------------
 # NEW: Plot function
 # ---------------------------------------------------------------------------
+# One figure serves the plots of both sensors; it is cleared between them
+# instead of a new figure (canvas, renderer, fonts) being set up per PNG
+_FIG = None
+
+
+def _plot_axes():
+    """Return (fig, ax) of the shared figure, emptied for the next plot."""
+    if 'matplotlib.pyplot' not in sys.modules:
+        import matplotlib
+        matplotlib.use('Agg')         # PNG output only – no GUI backend
+    import matplotlib.pyplot as plt   # only needed when a graph is made
+
+    global _FIG
+    if _FIG is None:
+        _FIG = plt.figure()
+    _FIG.clear()
+    return _FIG, _FIG.add_subplot()
+
+
 def plot_calib(x_test: np.ndarray,
                y_pred: np.ndarray,
                stats: dict,
@@ -178,21 +250,25 @@ def plot_calib(x_test: np.ndarray,
     if not make_graph:
         return
 
-    x_max = x_test.max()
-    x_end = 100 if x_max >= 50 else int(np.ceil(x_max / 10.0)) * 10
+    # axis limits are plain Python scalars
+    x_max = float(x_test.max())
+    x_end = 100 if x_max >= 50 else math.ceil(x_max / 10.0) * 10
     x_end = max(x_end, 10)
 
-    y_min = y_pred.min()
-    y_start = 0 if y_min >= 0 else int(np.floor(y_min / 10.0)) * 10
+    y_min = float(y_pred.min())
+    y_start = 0 if y_min >= 0 else math.floor(y_min / 10.0) * 10
 
 
-    fig, ax = plt.subplots()
-    ax.scatter(x_test, y_pred, marker='.', alpha=0.2, color='blue', label='data')
+    fig, ax = _plot_axes()
+    # Markers via plot() take Agg's draw_markers fast path (one stamped
+    # marker) instead of scatter's per-point path collection
+    ax.plot(x_test, y_pred, linestyle='none', marker='.', alpha=0.2,
+            color='blue', label='data', rasterized=True)
 
-    xs = np.array([0, x_end])
-    ys = stats['slope'] * xs + stats['intercept']
-    y_max = np.max(ys)
-    y_end = 100 if x_end == 100 and y_max <= 100 else int(np.ceil(y_max / 10.0)) * 10
+    xs = [0, x_end]
+    ys = [stats['slope'] * x + stats['intercept'] for x in xs]
+    y_max = max(ys)
+    y_end = 100 if x_end == 100 and y_max <= 100 else math.ceil(y_max / 10.0) * 10
 
     ax.plot(xs, ys, color='black',
             label=f'y = {stats["slope"]:.4f}x + {stats["intercept"]:.4f}\n'
@@ -207,8 +283,8 @@ def plot_calib(x_test: np.ndarray,
     ax.legend()
 
     out_png = label.lower().replace('%', '').replace(' ', '') + "_rhref_regression.png"
-    fig.savefig(out_png, dpi=300, bbox_inches='tight')
-    plt.close(fig)
+    fig.tight_layout()
+    fig.savefig(out_png, dpi=300)
     print(f'→ saved plot to {out_png}')
 
 
@@ -309,11 +385,17 @@ def write_thpcal_json(
     Converts the outer integer keys to strings (required by JSON),
     and then pretty-prints with indentation.
     """
-    # Convert int keys → str so JSON object is valid
-    raw = {str(number): sensors for number, sensors in cal_dict.items()}
+    if orjson is not None:
+        # Same layout as the json.dump below; int keys become strings
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(cal_dict, option=orjson.OPT_INDENT_2
+                                 | orjson.OPT_NON_STR_KEYS))
+    else:
+        # Convert int keys → str so JSON object is valid
+        raw = {str(number): sensors for number, sensors in cal_dict.items()}
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(raw, f, ensure_ascii=False, indent=2)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(raw, f, ensure_ascii=False, indent=2)
     print(f'→ saved thpcal.json')
 
 
@@ -361,66 +443,42 @@ def main():
     # ------------------------------------------------------------------
     # 2.  Read & optionally restrict by -s / -e
     # ------------------------------------------------------------------
-    _, df = read_and_filter_data(merged_csv_path)
+    dt, df = read_and_filter_data(merged_csv_path)
     
-    # Remove nan rows
-    df.dropna(inplace=True)
+    # Skip rows with any missing value.  The mask is applied to the NumPy
+    # columns taken below instead of rebuilding the frame with dropna();
+    # with no gaps the columns stay views.
+    keep = df.notna().all(axis=1).to_numpy()
+    rows = slice(None) if keep.all() else keep
 
     # Translate -s / -e (seconds) into *indices* using the Time (s) column
     # They may only *reduce* the default span, never extend it.
-    time_col = df['Time (s)'].to_numpy()
+    time_col = df['Time (s)'].to_numpy()[rows]
 
     # Start clip
     if args.start is not None:
-        idx_candidates = np.where(time_col >= args.start)[0]
-        if idx_candidates.size:
-            new_start_idx = int(idx_candidates[0])
+        after = time_col >= args.start
+        if after.any():
+            new_start_idx = int(after.argmax())       # first row at/after -s
             # Only shrink (move forward in time)
             if new_start_idx > x_start:
                 x_start = new_start_idx
 
     # End clip (initially full length)
-    global_end_idx = len(df) - 1
+    global_end_idx = len(time_col) - 1
     if args.end is not None:
-        idx_candidates = np.where(time_col <= args.end)[0]
-        if idx_candidates.size:
-            new_end_idx = int(idx_candidates[-1])
+        before = time_col <= args.end
+        if before.any():
+            new_end_idx = len(before) - 1 - int(before[::-1].argmax())  # last row at/before -e
             # Only shrink (move backward in time)
             if new_end_idx < global_end_idx:
                 global_end_idx = new_end_idx
     
     
-    # 1) Get current directory
-    curdir = os.getcwd()
-    dir_path = Path(curdir)
-
-    # 2) Find the latest merged CSV (including parent directory)
-    merged_csv_path = find_latest_merged_csv()
-    if merged_csv_path is None:
-        print('Merge file not found.')
-        sys.exit()
-
-    # 3) Read/Filter merged-*.csv
-    #- df = read_and_filter_data(merged_csv_path)
-    dt, df = read_and_filter_data(merged_csv_path)
-    
-    df.dropna(inplace=True)
-    length = len(df)
-    x_end = len(df)
-      
     # 4) Determine sensor count
-    ref_col = ''
-    if 'RHref (%RH)' in df.columns:
-        ref_col = df.columns.get_loc('RHref (%RH)')
-        refs = np.array(df.iloc[:, ref_col])
-    has_sensor1 = False
-    has_sensor2 = False
-    if 'RH1% (%)' in df.columns:
-        sensor_col1 = df.columns.get_loc('RH1% (%)')
-        has_sensor1 = True
-    if 'RH2% (%)' in df.columns:
-        sensor_col2 = df.columns.get_loc('RH2% (%)')
-        has_sensor2 = True
+    refs = df['RHref (%RH)'].to_numpy(np.float32, copy=False)[rows]
+    has_sensor1 = 'RH1% (%)' in df.columns
+    has_sensor2 = 'RH2% (%)' in df.columns
 
     # Decribe sensors
     sensors = [
@@ -430,7 +488,6 @@ def main():
             "col":   "RHref (%RH)",               # column name in df
             "start": -1,
             "end": -1,
-            "col_idx": ref_col,                   # numeric column index
             "active": True                        # always present
         },
         {
@@ -443,7 +500,6 @@ def main():
             "data": [],
             "start": -1,
             "end": -1,
-            "col_idx": sensor_col1,
             "active": has_sensor1
         },
         {
@@ -456,7 +512,6 @@ def main():
             "data": [],
             "start": -1,
             "end": -1,
-            "col_idx": sensor_col2,
             "active": has_sensor2
         },
     ]
@@ -477,10 +532,11 @@ def main():
             sensors[2]["sensor"] = zone + str(num2)
                 
 
-    if has_sensor1:
-        sensors[1]["data"] = np.array(df.iloc[:, sensor_col1])
-    if has_sensor2:
-        sensors[2]["data"] = np.array(df.iloc[:, sensor_col2])
+    # All active sensor columns in one (rows, sensors) array
+    measured = [i for i in (1, 2) if sensors[i]['active']]
+    data = df[[sensors[i]['col'] for i in measured]].to_numpy()[rows]
+    for k, i in enumerate(measured):
+        sensors[i]["data"] = data[:, k]
 
 
     # Minium and maximum allowed sensor values
@@ -490,32 +546,18 @@ def main():
     is_drying = (refs[-1] - refs[0] < 0)
     
     # Check reference valid range ---------------------------------------------
-    if is_drying:
-        mins = np.where(refs < min_val)[0]
-        if len(mins) > 0:
-            sensors[0]['end'] = mins[0] -1
-        else:
-            sensors[0]['end'] = len(refs)
-    else:
-        maxs = np.where(refs > max_val)[0]
-        if len(maxs) > 0:
-            sensors[0]['end'] = maxs[0] - 1
-        else:
-            sensors[0]['end'] = len(refs)
+    sensors[0]['end'] = int(valid_end(refs, is_drying, min_val, max_val))
     sensors[0]['start'] = x_start
 
+    # ...and of every sensor column in the same scan
+    sensor_ends = valid_end(data, is_drying, min_val, max_val)
+
 
     # Create a results dict
     results = {}
 
     # Loop trough sensors
-    i = 1
-    while i <= 2:
-        # Check if sensor data is found
-        if not sensors[i]['active']:
-            i += 1
-            continue
-
+    for k, i in enumerate(measured):
         print("")
         results.update({i: {sensors[i]['sensor']:
                        {sensors[i]['type']:
@@ -531,37 +573,14 @@ def main():
         
         # Determine valid ranges
         sensors[i]['start'] = 0
-        if is_drying:
-            mins = np.where(sensors[i]["data"] < min_val)[0]
-            if len(mins) > 0:
-                sensors[i]['end'] = mins[0] - 1
-            else:
-                sensors[i]['end'] = len(sensors[1]["data"])
-        else:
-            maxs = np.where(sensors[i]["data"] > max_val)[0]
-            if len(maxs) > 0:
-                sensors[i]['end'] = maxs[0] - 1
-            else:
-                sensors[i]['end'] = len(sensors[1]["data"])
+        sensors[i]['end'] = int(sensor_ends[k])
 
         # Clip from the beginning
         sensors[i]['start'] = x_start
         
-        # Set x0
-        a = sensors[0]['start']
-        b = sensors[i]['start']
-        if a >= b:
-            x0 = a
-        else:
-            x0 = b
-        
-        # Set x1
-        a = sensors[0]['end']
-        b = sensors[i]['end']
-        if a <= b:
-            x1 = a
-        else:
-            x1 = b 
+        # Span valid for both the reference and this sensor
+        x0 = max(sensors[0]['start'], sensors[i]['start'])
+        x1 = min(sensors[0]['end'], sensors[i]['end'])
         
         # Respect global end limit (‑e) for *each* sensor
         if 'global_end_idx' in locals():
@@ -571,7 +590,7 @@ def main():
         xs = sensors[i]['data'][x0:x1]
         ys = refs[x0:x1]
         
-        mdl, Xte, yte, yhat, stats = run_regression(xs, ys)
+        Xte, yte, yhat, stats = run_regression(xs, ys)
 
         # Calibration dict: additions
         # Add results in corresponding dictionary
@@ -589,11 +608,9 @@ def main():
         # -----------------------------------------------------------------
         # 6.  Optional graph generation
         # -----------------------------------------------------------------
-        plot_calib(Xte.flatten(), yhat, stats,
+        plot_calib(Xte, yhat, stats,
                    label=sensor_label,
                    make_graph=not (args.n or args.N))        
-
-        i += 1
     
     # Calibration dict: additions
     if not args.N:
@@ -18,7 +18,7 @@ from __future__ import annotations
 ###############################################################################
 # Imports
 ###############################################################################
-import argparse, glob, os, re, shlex, sys
+import argparse, os, re, shlex, sys
 import posixpath
 from datetime import datetime
 from pathlib import Path
@@ -26,14 +26,28 @@ from typing import List, Dict, Any, Tuple
 
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")          # PNG output only – no GUI backend
 import matplotlib.pyplot as plt
 from scipy.stats import linregress
-from sklearn.linear_model import LinearRegression
 
 # NEW – JSON calibration helpers
 import json
 from thpcaldb import parse_zone_numbers
 
+# Optional C serializer for thpcal.json; stdlib json is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional JIT for the sliding‑window scan; without numba the NumPy
+# block version in window_stats() is used
+try:
+    from numba import njit, prange
+except ImportError:
+    njit, prange = None, range
+
 ###############################################################################
 # CONSTANTS & FILE PATTERNS
 ###############################################################################
@@ -48,6 +62,7 @@ REG_TXT_FMT     = "{tag}_tref_regression.txt"
 ANALYSIS_CSV    = "{tag}_analysis.csv"
 RANK_CSV        = "{tag}-ranks.csv"
 RANK_TXT        = "{tag}-ranks.txt"
+MERGED_RE       = re.compile(r"merged-\d{8}-\d{6}\.csv$")
 
 ###############################################################################
 # JSON‑dict helper functions (borrowed from *rh‑analysis.py*)
@@ -103,8 +118,14 @@ def read_and_merge_thpcal_json(filename: str, new_entries: Dict[int, Dict[str, D
 
 def write_thpcal_json(filename: str, cal_dict: Dict[int, Dict[str, Dict[str, Any]]]) -> None:
     raw = {str(k): v for k, v in cal_dict.items()}
-    with open(filename, "w", encoding="utf-8") as fh:
-        json.dump(raw, fh, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # Same layout as the json.dump below; values may be NumPy floats
+        out = orjson.dumps(raw, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        with open(filename, "wb") as fh:
+            fh.write(out)
+    else:
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(raw, fh, ensure_ascii=False, indent=2)
     print("→ saved thpcal.json")
 
 ###############################################################################
@@ -112,13 +133,95 @@ def write_thpcal_json(filename: str, cal_dict: Dict[int, Dict[str, Dict[str, Any
 ###############################################################################
 
 def newest_merged() -> Path | None:
-    patt = re.compile(r"merged-\d{8}-\d{6}\.csv$")
-    files = [Path(f) for f in glob.glob("merged-*.csv") if patt.search(f)]
-    return max(files, key=lambda p: p.stat().st_mtime) if files else None
-
-
-def lslope(df: pd.DataFrame, x: str, y: str) -> float:
-    return float(LinearRegression().fit(df[[x]], df[y]).coef_[0])
+    """Most recently modified merged-YYYYMMDD-hhmmss.csv in the working dir.
+
+    One scandir pass with a running maximum; only matching names are
+    stat()ed and nothing is collected or sorted."""
+    best, best_mtime = None, None
+    with os.scandir(".") as it:
+        for entry in it:
+            if not MERGED_RE.match(entry.name):
+                continue
+            mtime = entry.stat().st_mtime
+            if best_mtime is None or mtime > best_mtime:
+                best, best_mtime = entry.name, mtime
+    return Path(best) if best else None
+
+
+def lslope(x: np.ndarray, y: np.ndarray) -> float:
+    """Least‑squares slope of *y* vs. *x* (closed form, centred sums)."""
+    dx = x - x.mean()
+    return float(dx @ (y - y.mean()) / (dx @ dx))
+
+
+def _window_stats_loop(t, y, starts, window):
+    """Per‑window kernel of window_stats() for numba: a mean pass and a
+    centred slope pass per window, windows spread over threads (prange)."""
+    n = len(y)
+    k = len(starts)
+    slope = np.empty(k)
+    mean = np.empty(k)
+    for j in prange(k):
+        a = starts[j]
+        b = min(a + window, n)
+        st = 0.0
+        sy = 0.0
+        for i in range(a, b):
+            st += t[i]
+            sy += y[i]
+        tm = st / (b - a)
+        ym = sy / (b - a)
+        sxx = 0.0
+        sxy = 0.0
+        for i in range(a, b):
+            dx = t[i] - tm
+            sxx += dx * dx
+            sxy += dx * (y[i] - ym)
+        slope[j] = sxy / sxx if sxx > 0.0 else np.nan
+        mean[j] = ym
+    return slope, mean
+
+
+# Compiled on first use; cache=True keeps the machine code between runs
+_window_stats_jit = (njit(parallel=True, fastmath=True, cache=True)(_window_stats_loop)
+                     if njit is not None else None)
+
+
+def window_stats(t: np.ndarray, y: np.ndarray, starts: np.ndarray,
+                 window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Slope (vs. *t*) and mean of *y* over every window y[p : p+window],
+    p in *starts*; windows running past the end are shortened.
+
+    Each window is centred on its own means before the sums, exactly as a
+    per‑window fit would, so flat or repeated plateaus give exact zero
+    slopes and equal means (band selection relies on those ties).  Full
+    windows are processed as (windows, window) blocks of a sliding view;
+    *y* may be float32, the sums are accumulated in float64.  With numba
+    the windows are summed by the compiled kernel instead."""
+    if _window_stats_jit is not None:
+        return _window_stats_jit(t, y, starts, window)
+
+    slope = np.empty(len(starts))
+    mean = np.empty(len(starts))
+
+    def fit(tw: np.ndarray, yw: np.ndarray, rows) -> None:
+        tm = tw.mean(axis=-1, keepdims=True)
+        ym = yw.mean(axis=-1, dtype=np.float64, keepdims=True)
+        dx = tw - tm
+        slope[rows] = (dx * (yw - ym)).sum(axis=-1) / (dx * dx).sum(axis=-1)
+        mean[rows] = ym[..., 0]
+
+    full = np.flatnonzero(starts + window <= len(y))
+    if len(full):
+        t_win = np.lib.stride_tricks.sliding_window_view(t, window)
+        y_win = np.lib.stride_tricks.sliding_window_view(y, window)
+        step = max(1, (1 << 20) // window)        # bounds the gathered block
+        for b in range(0, len(full), step):
+            rows = full[b:b + step]
+            fit(t_win[starts[rows]], y_win[starts[rows]], rows)
+    for j in np.flatnonzero(starts + window > len(y)):   # shortened tail
+        fit(t[starts[j]:], y[starts[j]:], j)
+    return slope, mean
 
 
 def rank_by_score(df: pd.DataFrame) -> pd.DataFrame:
@@ -127,13 +230,12 @@ def rank_by_score(df: pd.DataFrame) -> pd.DataFrame:
     return ranked
 
 
-def bands(levels: List[int]):
-    out = []
-    for i, lvl in enumerate(levels):
-        lo = levels[i - 1] if i else lvl
-        hi = levels[i + 1] if i < len(levels) - 1 else lvl
-        out.append(((lvl + lo) / 2, lvl, (lvl + hi) / 2))
-    return out
+def bands(levels: List[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lo, mid, hi) arrays: each level's band reaches halfway to its
+    neighbours; the outermost bands end at their own level."""
+    mid = np.asarray(levels, dtype=float)
+    edges = (mid[:-1] + mid[1:]) / 2
+    return np.r_[mid[0], edges], mid, np.r_[edges, mid[-1]]
 
 # --- auto‑scale helper (import from RH script) ------------------------------
 
@@ -147,22 +249,36 @@ def get_time_scale_and_label(max_time_s: float) -> tuple[float, str]:
     return 1 / 86_400.0, "Time (d)"
 
 
+_FIG = None
+
+
+def _plot_axes(figsize=None):
+    """Return (fig, ax) of the shared figure, emptied and resized for the next plot."""
+    global _FIG
+    if _FIG is None:
+        _FIG = plt.figure()
+    _FIG.clear()
+    _FIG.set_size_inches(figsize or plt.rcParams["figure.figsize"])
+    return _FIG, _FIG.add_subplot()
+
+
 def plot_plateaus(df_full: pd.DataFrame, subset: pd.DataFrame, sensor_col: str, out_png: Path, *, auto_scale: bool = False) -> None:
     if subset.empty:
         return
     scale, xlabel = (get_time_scale_and_label(df_full[TIME_COL].max()) if auto_scale else (1.0, "Time (s)"))
     t_scaled = df_full[TIME_COL] * scale
-    fig, ax = plt.subplots()
+    fig, ax = _plot_axes()
     ax.plot(t_scaled, df_full[REF_COL], label="Tref", color="tab:red", lw=1.2)
     ax.plot(t_scaled, df_full[sensor_col], label=sensor_col, color="tab:blue", lw=1.0)
-    for _, r in subset.iterrows():
-        s_sc, e_sc = r.Tstart * scale, r.Tend * scale
-        ax.hlines([r.Mean_ref, r.Mean_sens], xmin=s_sc, xmax=e_sc, colors="k")
-        ax.vlines((s_sc + e_sc) / 2, min(r.Mean_ref, r.Mean_sens), max(r.Mean_ref, r.Mean_sens), colors="k")
+    # All plateau markers as two LineCollections
+    s_sc, e_sc = subset.Tstart.to_numpy() * scale, subset.Tend.to_numpy() * scale
+    m_ref, m_sens = subset.Mean_ref.to_numpy(), subset.Mean_sens.to_numpy()
+    ax.hlines(np.concatenate((m_ref, m_sens)), xmin=np.tile(s_sc, 2), xmax=np.tile(e_sc, 2), colors="k")
+    ax.vlines((s_sc + e_sc) / 2, np.minimum(m_ref, m_sens), np.maximum(m_ref, m_sens), colors="k")
     ax.set_xlabel(xlabel); ax.set_ylabel("Temperature (°C)")
     ax.set_title(f"Calibration plateaus – {sensor_col}")
     ax.grid(True, ls=":", lw=0.5); ax.legend()
-    fig.tight_layout(); fig.savefig(out_png, dpi=300); plt.close(fig)
+    fig.tight_layout(); fig.savefig(out_png, dpi=300)
 
 ###############################################################################
 # MAIN WORKFLOW
@@ -188,10 +304,21 @@ def main() -> None:
     if merged is None:
         print("No merged-*.csv found"); sys.exit(1)
 
-    df = pd.read_csv(merged)
+    # Parse only the columns used below; t2 and Datetime are optional, so
+    # pick them from the header first.
+    header = pd.read_csv(merged, nrows=0).columns
     for req in (TIME_COL, REF_COL, SENS1_COL):
-        if req not in df.columns:
+        if req not in header:
             print("Missing", req); sys.exit(1)
+    cols = [c for c in ("Datetime", TIME_COL, REF_COL, SENS1_COL, SENS2_COL) if c in header]
+    # Temperatures carry 0.01 °C resolution, so float32 is ample; time
+    # stays float64 to keep sub‑second steps on long logs.
+    dtypes = {c: {"Datetime": str, TIME_COL: np.float64}.get(c, np.float32) for c in cols}
+    # Multi-threaded Arrow parser when pyarrow is installed
+    try:
+        df = pd.read_csv(merged, engine="pyarrow", usecols=cols, dtype=dtypes)
+    except ImportError:
+        df = pd.read_csv(merged, engine="c", usecols=cols, dtype=dtypes)
     has_t2 = SENS2_COL in df.columns
 
     # Extract first Datetime string if present (for JSON)
@@ -215,33 +342,34 @@ def main() -> None:
             args.cal = None  # disable JSON path
 
     # ------------------------------------------------------------------
-    # 1.  Sliding‑window search for plateaus (unchanged, freshly copied)
+    # 1.  Sliding‑window search for plateaus (all windows at once)
     # ------------------------------------------------------------------
-    results_windows: Dict[str, List[dict]] = {"t1": [], "t2": []}
-    pos = args.start
-    while pos < len(df) - 1:
-        win = df.iloc[pos : pos + args.window]
-        if win.empty:
-            break
-        mean_ref = win[REF_COL].mean(); slope_ref = lslope(win, TIME_COL, REF_COL)
-
-        def consider(col: str, store: List[dict]):
-            mean_s = win[col].mean()
-            if abs(mean_s - mean_ref) > args.maxdt:
-                return
-            slope_s = lslope(win, TIME_COL, col)
-            score = abs(slope_s) + abs(slope_ref)
-            if score > args.th:
-                return
-            store.append(dict(Start=pos, End=pos+len(win)-1, Tstart=win[TIME_COL].iat[0], Tend=win[TIME_COL].iat[-1],
-                              Slope_ref=slope_ref, Slope_sens=slope_s, Mean_ref=mean_ref, Mean_sens=mean_s, Score=score))
-
-        consider(SENS1_COL, results_windows["t1"])
-        if has_t2:
-            consider(SENS2_COL, results_windows["t2"])
-        pos += args.interval
-
-    frames = {k: rank_by_score(pd.DataFrame(v)) for k, v in results_windows.items() if v}
+    t_vec = df[TIME_COL].to_numpy(dtype=np.float64)
+    starts = np.arange(args.start, len(df) - 1, args.interval)   # ≥ 2 rows each
+    ends = np.minimum(starts + args.window, len(df)) - 1          # last row
+    # Means are rounded to 1e‑5 °C: below that they only carry float32
+    # storage noise (up to ~4e‑6 °C under 128 °C), which would show in the
+    # reports and split ties in the band selection.
+    slope_ref, mean_ref = window_stats(t_vec, df[REF_COL].to_numpy(dtype=np.float32),
+                                       starts, args.window)
+    mean_ref = mean_ref.round(5)
+
+    def scan(col: str) -> pd.DataFrame:
+        slope_s, mean_s = window_stats(t_vec, df[col].to_numpy(dtype=np.float32),
+                                       starts, args.window)
+        mean_s = mean_s.round(5)
+        score = np.abs(slope_s) + np.abs(slope_ref)
+        keep = (np.abs(mean_s - mean_ref) <= args.maxdt) & (score <= args.th)
+        first, last = starts[keep], ends[keep]
+        return pd.DataFrame(dict(Start=first, End=last, Tstart=t_vec[first], Tend=t_vec[last],
+                                 Slope_ref=slope_ref[keep], Slope_sens=slope_s[keep],
+                                 Mean_ref=mean_ref[keep], Mean_sens=mean_s[keep], Score=score[keep]))
+
+    results_windows: Dict[str, pd.DataFrame] = {"t1": scan(SENS1_COL)}
+    if has_t2:
+        results_windows["t2"] = scan(SENS2_COL)
+
+    frames = {k: rank_by_score(v) for k, v in results_windows.items() if not v.empty}
 
     # Save full analysis CSV next to merged file
     for tag, df_tag in frames.items():
@@ -251,16 +379,25 @@ def main() -> None:
     # ------------------------------------------------------------------
     # 2.  Pick one plateau per TARGET_LEVELS band
     # ------------------------------------------------------------------
-    band_defs = bands(TARGET_LEVELS)
+    los, mids, his = bands(TARGET_LEVELS)
     chosen: Dict[str, List[int]] = {}
     for tag, df_tag in frames.items():
-        picks, seen = [], set()
-        for lo, mid, hi in band_defs:
-            idx = (df_tag["Mean_ref"] - mid).abs().idxmin()
-            row = df_tag.loc[idx]
-            if lo <= row.Mean_ref <= hi and row.Rank not in seen:
-                picks.append(int(row.Rank)); seen.add(int(row.Rank))
-        chosen[tag] = picks
+        mean_ref, rank = df_tag["Mean_ref"].to_numpy(), df_tag["Rank"].to_numpy()
+        # Window nearest to each band centre via one sort + searchsorted;
+        # the stable sort keeps rank order, so a block's first entry is its
+        # best‑ranked window (ties go to the better rank, as with idxmin).
+        order = np.argsort(mean_ref, kind="stable")
+        ms = mean_ref[order]
+        pos = np.searchsorted(ms, mids)
+        lpos, rpos = np.maximum(pos - 1, 0), np.minimum(pos, len(ms) - 1)
+        d_left = np.where(pos > 0, np.abs(ms[lpos] - mids), np.inf)
+        d_right = np.where(pos < len(ms), np.abs(ms[rpos] - mids), np.inf)
+        first_left = order[np.searchsorted(ms, ms[lpos])]
+        first_right = order[np.searchsorted(ms, ms[rpos])]
+        best = np.where(d_left < d_right, first_left,
+                        np.where(d_right < d_left, first_right, np.minimum(first_left, first_right)))
+        ok = (los <= mean_ref[best]) & (mean_ref[best] <= his)
+        chosen[tag] = list(dict.fromkeys(int(r) for r in rank[best[ok]]))   # unique, band order
 
     def save_ranks(tag: str) -> pd.DataFrame:
         if not chosen.get(tag):
@@ -289,14 +426,14 @@ def main() -> None:
         print(f"  {tag.upper()} → slope={lr.slope:.5f}  intercept={lr.intercept:.3f}  R²={r2:.6f}  N={len(x)}")
 
         # Scatter + fit plot
-        fig, ax = plt.subplots(figsize=(6, 6))
-        ax.scatter(x, y, label="data")
+        fig, ax = _plot_axes(figsize=(6, 6))
+        ax.scatter(x, y, label="data", rasterized=True)
         xr = np.array([x.min() - 1, x.max() + 1])
         fit_label = f"y = {lr.slope:.4f}x + {lr.intercept:.4f}\nR² = {r2:.6f}"
         ax.plot(xr, lr.slope * xr + lr.intercept, label=fit_label)
         ax.set_xlabel(f"{tag.upper()} (°C)"); ax.set_ylabel("Tref (°C)")
         ax.set_title("Temperature regression"); ax.grid(True); ax.legend(); ax.set_aspect("equal")
-        fig.tight_layout(); fig.savefig(OUTDIR / REG_PNG_FMT.format(tag=tag), dpi=300); plt.close(fig)
+        fig.tight_layout(); fig.savefig(OUTDIR / REG_PNG_FMT.format(tag=tag), dpi=300)
 
         # TXT summary
         with open(OUTDIR / REG_TXT_FMT.format(tag=tag), "w", encoding="utf-8") as fh:
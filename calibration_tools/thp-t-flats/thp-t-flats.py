@@ -26,12 +26,17 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
-from sklearn.linear_model import LinearRegression
 from scipy.stats import linregress
 
 # Calibration‑dictionary helper ---------------------------------------------
 from thpcaldb import parse_zone_numbers
 
+# Optional C serializer for thpcal.json; stdlib json is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 ###############################################################################
 # --- JSON helpers (borrowed from t‑analysis.py) -----------------------------
 ###############################################################################
@@ -61,8 +66,15 @@ def merge_thpcal(existing: dict, new_entries: dict) -> dict:
 
 
 def write_thpcal_json(path: str, data: dict) -> None:
-    with open(path, "w", encoding="utf-8") as fh:
-        json.dump({str(k): v for k, v in data.items()}, fh, indent=2, ensure_ascii=False)
+    raw = {str(k): v for k, v in data.items()}
+    if orjson is not None:
+        # Same layout as the json.dump below; values may be NumPy floats
+        out = orjson.dumps(raw, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        with open(path, "wb") as fh:
+            fh.write(out)
+    else:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(raw, fh, indent=2, ensure_ascii=False)
 
 ###############################################################################
 # PART A) SHIFT LOGIC (unchanged)
@@ -106,36 +118,70 @@ def align_data_for_shift(sens_time, sens_temp, ref_time, ref_temp, best_shift, m
 ###############################################################################
 
 def compute_slope(df: pd.DataFrame, xcol: str, ycol: str):
-    reg = LinearRegression().fit(df[[xcol]].values, df[ycol].values)
-    return float(reg.coef_[0]), float(reg.intercept_)
+    """Least‑squares slope & intercept of *ycol* vs. *xcol* (closed form)."""
+    x = df[xcol].to_numpy(dtype=float)
+    y = df[ycol].to_numpy(dtype=float)
+    x_mean, y_mean = x.mean(), y.mean()
+    dx = x - x_mean
+    slope = float(dx @ (y - y_mean) / (dx @ dx))
+    return slope, float(y_mean - slope * x_mean)
 
 
 def calc_window_slopes(df, time_col, ref_col, sensor_col, interval, window):
-    results = []
-    t_min, t_max = df[time_col].min(), df[time_col].max()
-    s = t_min
-    while (s + window - 1) <= t_max:
-        sub = df[(df[time_col] >= s) & (df[time_col] <= s + window - 1)]
-        if len(sub) < 2:
-            s += interval; continue
-        m_ref, _ = compute_slope(sub, time_col, ref_col)
-        m_sen, _ = compute_slope(sub, time_col, sensor_col)
-        sum_abs = abs(m_ref) + abs(m_sen)
-        results.append({
-            "Interval start (s)": s,
-            "Interval end (s)": s + window,  # half‑open
-            "Sum of abs(slope)": sum_abs,
-            f"Slope: {ref_col}": m_ref,
-            f"Slope: {sensor_col}": m_sen,
-            f"Mean: {ref_col}": sub[ref_col].mean(),
-            f"Mean: {sensor_col}": sub[sensor_col].mean(),
-            f"Min: {ref_col}": sub[ref_col].min(),
-            f"Max: {ref_col}": sub[ref_col].max(),
-            f"Min: {sensor_col}": sub[sensor_col].min(),
-            f"Max: {sensor_col}": sub[sensor_col].max(),
-        })
-        s += interval
-    return results
+    """Slope, mean, min and max of *ref_col* and *sensor_col* for every time
+    window [s, s+window-1], s = t_min, t_min+interval, … (columns as dict).
+
+    Window bounds come from searchsorted on the sorted time axis; the rows
+    of all windows are gathered into one array and summed per window with
+    reduceat.  Each window is centred on its own means, as the per‑window
+    fit was, so repeated plateaus keep exact ties in 'Sum of abs(slope)'."""
+    t = df[time_col].to_numpy(dtype=float)
+    order = np.argsort(t, kind="stable")
+    t = t[order]
+    if len(t) == 0 or t[-1] - window + 1 < t[0]:
+        return {}
+    s = t[0] + interval * np.arange(int((t[-1] - window + 1 - t[0]) // interval) + 1)
+    lo = np.searchsorted(t, s, side="left")
+    hi = np.searchsorted(t, s + window - 1, side="right")
+    keep = hi - lo >= 2
+    if not keep.any():
+        return {}
+    s, lo, hi = s[keep], lo[keep], hi[keep]
+    n = hi - lo
+    # Row indices of every window back to back; window k is the segment
+    # seg[k] : seg[k] + n[k] of the gathered arrays
+    seg = np.concatenate(([0], np.cumsum(n)[:-1]))
+    idx = np.arange(n.sum()) + np.repeat(lo - seg, n)
+
+    def wmean(v: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(v, seg) / n
+
+    tg = t[idx]
+    dx = tg - np.repeat(wmean(tg), n)
+    sxx = np.add.reduceat(dx * dx, seg)
+
+    def stats(col):
+        yg = df[col].to_numpy(dtype=float)[order][idx]
+        y_mean = wmean(yg)
+        sxy = np.add.reduceat(dx * (yg - np.repeat(y_mean, n)), seg)
+        return (sxy / sxx, y_mean,
+                np.minimum.reduceat(yg, seg), np.maximum.reduceat(yg, seg))
+
+    m_ref, mean_ref, min_ref, max_ref = stats(ref_col)
+    m_sen, mean_sen, min_sen, max_sen = stats(sensor_col)
+    return {
+        "Interval start (s)": s,
+        "Interval end (s)": s + window,  # half‑open
+        "Sum of abs(slope)": np.abs(m_ref) + np.abs(m_sen),
+        f"Slope: {ref_col}": m_ref,
+        f"Slope: {sensor_col}": m_sen,
+        f"Mean: {ref_col}": mean_ref,
+        f"Mean: {sensor_col}": mean_sen,
+        f"Min: {ref_col}": min_ref,
+        f"Max: {ref_col}": max_ref,
+        f"Min: {sensor_col}": min_sen,
+        f"Max: {sensor_col}": max_sen,
+    }
 
 
 def partition_calibration_points(df_sorted, ref_col, sensor_col, threshold, segments):
@@ -259,10 +305,11 @@ def main() -> None:
 
     # ---------------------------------------------------------------- merged CSV
     patt = re.compile(r"^merged-.*\.csv$")
-    merged_files = sorted([f for f in os.listdir(".") if patt.match(f)])
-    if not merged_files:
+    # newest by name (timestamped), one pass – no sort
+    with os.scandir(".") as it:
+        merged_filename = max((e.name for e in it if patt.match(e.name)), default=None)
+    if merged_filename is None:
         print("No merged-*.csv found!"); sys.exit(1)
-    merged_filename = merged_files[-1]
     df = pd.read_csv(merged_filename)
 
     # Datetime for JSON